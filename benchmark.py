@@ -0,0 +1,195 @@
+# 🎬 CineRAG-AI - Benchmark Suite
+# Reproducible performance measurements on synthetic catalogs, fully offline
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from main import SYSTEM_VERSION, CineRAGAI, HashingEncoder, Movie
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Family',
+          'Fantasy', 'Horror', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War']
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'xe', 'zu',
+             'bra', 'cle', 'dri', 'fro', 'gla', 'pli', 'sno', 'tra', 'vel', 'wyn']
+DESCRIPTION_WORDS = 14
+GENERATION_CHUNK = 100_000  # Movies generated per vectorized draw
+
+def vocabulary() -> List[str]:
+    return [first + second for first in SYLLABLES for second in SYLLABLES]
+
+def synthetic_movies(count: int, seed: int = 42) -> Iterator[Movie]:
+    """
+    Yield a reproducible synthetic catalog
+
+    Description words follow a Zipf-like distribution over a fixed
+    vocabulary, like real text; titles are unique so feedback can refer
+    to them. Generated in chunks, so memory stays flat for any count.
+    """
+    rng = np.random.default_rng(seed)
+    words = vocabulary()
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+
+    for start in range(0, count, GENERATION_CHUNK):
+        size = min(GENERATION_CHUNK, count - start)
+        description_words = rng.choice(len(words), size=(size, DESCRIPTION_WORDS), p=weights)
+        title_words = rng.choice(len(words), size=(size, 2))
+        genres = rng.choice(len(GENRES), size=(size, 2))
+        years = rng.integers(1950, 2025, size)
+        ratings = np.round(rng.uniform(1.0, 9.5, size), 1)
+        for i in range(size):
+            yield Movie(
+                f"{words[title_words[i, 0]].title()} {words[title_words[i, 1]].title()} {start + i}",
+                str(years[i]),
+                GENRES[genres[i, 0]] if genres[i, 0] == genres[i, 1] else f"{GENRES[genres[i, 0]]}/{GENRES[genres[i, 1]]}",
+                float(ratings[i]),
+                " ".join(words[w] for w in description_words[i])
+            )
+
+def synthetic_queries(count: int, seed: int = 42) -> List[str]:
+    """Distinct three-to-five word queries drawn from the catalog vocabulary"""
+    rng = np.random.default_rng(seed + 1)
+    words = vocabulary()
+    queries = {}  # Insertion-ordered set; distinct queries never hit the query cache
+    while len(queries) < count:
+        queries[" ".join(words[w] for w in rng.choice(len(words), rng.integers(3, 6), replace=False))] = None
+    return list(queries)
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/mean of per-call durations, in milliseconds"""
+    milliseconds = np.asarray(samples) * 1000
+    return {
+        'p50_ms': float(np.percentile(milliseconds, 50)),
+        'p99_ms': float(np.percentile(milliseconds, 99)),
+        'mean_ms': float(milliseconds.mean())
+    }
+
+def timed(call, *args, **kwargs):
+    start = time.perf_counter()
+    result = call(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def benchmark_catalog(size: int, args) -> Dict:
+    """Run every measurement against one synthetic catalog of the given size"""
+    encoder = HashingEncoder()
+    results = {'catalog_size': size}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        # No curated seed movies, so the catalog holds exactly `size` titles
+        cinerag = CineRAGAI(ai_model=encoder, search_workers=args.search_workers, seed_catalog=False)
+        seconds, added = timed(cinerag.add_movies, synthetic_movies(size, args.seed), args.batch_size, False)
+    results['ingest'] = {'seconds': seconds, 'titles_per_second': added / seconds}
+    log(f"  ingest: {added / seconds:,.0f} titles/s")
+
+    # Synthetic users, each liking a random handful of titles
+    rng = np.random.default_rng(args.seed)
+    users = [f"user-{i}" for i in range(args.users)]
+    with quiet:
+        for user_id in users:
+            for row in rng.choice(len(cinerag.movies), min(args.likes, len(cinerag.movies)), replace=False):
+                cinerag.learn_user_preference(cinerag.movies[row].title, 'like', user_id)
+
+    # End-to-end search: encoder, scoring, personalization and ranking
+    queries = synthetic_queries(args.queries, args.seed)
+    samples = []
+    with quiet:
+        for i, query in enumerate(queries):
+            samples.append(timed(cinerag.intelligent_movie_search, query, 10, users[i % len(users)])[0])
+    results['search'] = latency_summary(samples)
+    log(f"  search: p50 {results['search']['p50_ms']:.2f} ms, p99 {results['search']['p99_ms']:.2f} ms")
+
+    # The same searches again, answered from the result cache
+    samples = []
+    with quiet:
+        for i, query in enumerate(queries):
+            samples.append(timed(cinerag.intelligent_movie_search, query, 10, users[i % len(users)])[0])
+    results['search_repeat'] = latency_summary(samples)
+    log(f"  repeat search: p50 {results['search_repeat']['p50_ms']:.3f} ms")
+
+    # Personalization overhead: the same encoded queries with and without a profile
+    query_embeddings = cinerag.encode_queries(queries)
+    anonymous, personalized = [], []
+    for i, query_embedding in enumerate(query_embeddings):
+        anonymous.append(timed(cinerag.rank_by_embedding, query_embedding, 10, '__benchmark_anonymous__')[0])
+        personalized.append(timed(cinerag.rank_by_embedding, query_embedding, 10, users[i % len(users)])[0])
+    results['scoring_anonymous'] = latency_summary(anonymous)
+    results['scoring_personalized'] = latency_summary(personalized)
+    results['personalization_overhead_ms'] = (results['scoring_personalized']['p50_ms']
+                                              - results['scoring_anonymous']['p50_ms'])
+
+    # Recommendations, uncached (first request per user and strategy)
+    samples = []
+    with quiet:
+        for strategy in ('centroid', 'multi'):
+            cinerag.recommendation_cache.clear()
+            for user_id in users:
+                samples.append(timed(cinerag.get_ai_recommendations, 10, user_id, strategy)[0])
+    results['recommendations'] = latency_summary(samples)
+    log(f"  recommendations: p50 {results['recommendations']['p50_ms']:.2f} ms")
+
+    with quiet:
+        results['save_seconds'] = timed(cinerag.save_system_data)[0]
+        cinerag.interaction_log.close()
+        results['load_seconds'], reloaded = timed(CineRAGAI, ai_model=encoder, seed_catalog=False)
+        reloaded.interaction_log.close()
+    log(f"  save {results['save_seconds']:.2f} s, load {results['load_seconds']:.2f} s")
+    return results
+
+def log(message: str):
+    print(message, file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CineRAG-AI on synthetic catalogs")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="Comma-separated catalog sizes (up to 10000000)")
+    parser.add_argument('--queries', type=int, default=200, help="Search queries timed per catalog")
+    parser.add_argument('--users', type=int, default=50, help="Synthetic user profiles")
+    parser.add_argument('--likes', type=int, default=10, help="Liked titles per synthetic user")
+    parser.add_argument('--batch-size', type=int, default=256, help="Ingest batch size")
+    parser.add_argument('--search-workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        'system_version': SYSTEM_VERSION,
+        'encoder': HashingEncoder().identity,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'settings': {name: value for name, value in vars(args).items() if name != 'output'},
+        'results': []
+    }
+
+    # Every catalog gets a scratch data directory; CineRAG-AI paths are relative
+    original_directory = os.getcwd()
+    for size in (int(size) for size in args.sizes.split(',')):
+        log(f"📊 CineRAG-AI benchmark: {size:,} titles")
+        with tempfile.TemporaryDirectory(prefix='cinerag-bench-') as directory:
+            os.chdir(directory)
+            try:
+                report['results'].append(benchmark_catalog(size, args))
+            finally:
+                os.chdir(original_directory)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        log(f"💾 Benchmark report written to {args.output}")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
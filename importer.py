@@ -0,0 +1,290 @@
+# 🎬 CineRAG-AI - Streaming Catalog Importer
+# Bulk-loads large CSV / TSV / JSONL movie dumps with bounded memory and resumable progress
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from main import (DATA_DIR, CineRAGAI, Movie, add_encoder_arguments, encoder_from_args, normalize_title,
+                  write_file_atomically)
+
+CHECKPOINT_DIR = os.path.join(DATA_DIR, 'imports')
+IMDB_NULL = '\\N'  # IMDb dumps mark missing values this way
+
+# Column names recognized for each Movie field, first match wins
+FIELD_ALIASES = {
+    'title': ('title', 'primaryTitle', 'name', 'originalTitle', 'movie_title'),
+    'year': ('year', 'startYear', 'release_year', 'release_date', 'released'),
+    'genre': ('genre', 'genres', 'listed_in'),
+    'rating': ('rating', 'averageRating', 'vote_average', 'imdb_rating', 'score'),
+    'description': ('description', 'overview', 'plot', 'summary', 'synopsis'),
+    'poster_url': ('poster_url', 'poster', 'poster_path', 'image')
+}
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    formats = {'.csv': 'csv', '.tsv': 'tsv', '.tab': 'tsv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}
+    if extension not in formats:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format csv, tsv or jsonl")
+    return formats[extension]
+
+def read_records(path: str, file_format: str) -> Iterator[Optional[Dict]]:
+    """
+    Stream raw records from a dump, one dict per row
+
+    Gzipped files are decompressed on the fly. Unparseable JSONL lines
+    yield None so record counts stay aligned with the file for resuming.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        if file_format == 'jsonl':
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                yield record if isinstance(record, dict) else None
+        elif file_format == 'tsv':
+            # IMDb TSVs use bare quotes inside titles, so quoting is off
+            yield from csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        else:
+            yield from csv.DictReader(f)
+
+def field(record: Dict, name: str) -> str:
+    for alias in FIELD_ALIASES[name]:
+        value = record.get(alias)
+        if isinstance(value, (list, tuple)):
+            # JSONL dumps often hold genres (and the like) as arrays
+            value = '/'.join(str(item).strip() for item in value if item is not None and str(item).strip())
+        if value is not None and value != IMDB_NULL:
+            return str(value).strip()
+    return ''
+
+def normalize_record(record: Optional[Dict], title_types=None) -> Optional[Movie]:
+    """Validate a raw record and normalize it into a Movie, or None to reject it"""
+    if not record:
+        return None
+    if title_types and record.get('titleType', 'movie') not in title_types:
+        return None
+
+    title = field(record, 'title')
+    if not title:
+        return None
+
+    year = field(record, 'year')[:4]
+    year = year if year.isdigit() else ''
+
+    genres = field(record, 'genre').replace('|', ',').replace('/', ',')
+    genre = '/'.join(genre.strip() for genre in genres.split(',') if genre.strip())
+
+    try:
+        rating = round(max(0.0, min(10.0, float(field(record, 'rating')))), 1)
+    except ValueError:
+        rating = 0.0
+
+    return Movie(title, year, genre, rating, field(record, 'description'), field(record, 'poster_url'))
+
+class CatalogImporter:
+    """
+    Streams a dump into CineRAG-AI: parse → normalize into Movie → batched encode → append
+
+    A background thread parses and normalizes rows into batches on a
+    bounded queue while the main thread encodes and stores them, so
+    parsing overlaps with model inference and at most `prefetch_batches`
+    batches are held in memory whatever the file size.
+
+    Progress (records consumed) is checkpointed after each periodic save,
+    so a rerun after a crash skips the rows already imported. Titles
+    already in the catalog are skipped, and movies encoded before a crash
+    are served from the embedding cache on the rerun.
+    """
+
+    def __init__(self, cinerag: CineRAGAI, path: str, file_format: str = None, batch_size: int = 256,
+                 checkpoint_every: int = 100_000, prefetch_batches: int = 8, title_types=None):
+        self.cinerag = cinerag
+        self.path = os.path.abspath(path)
+        self.file_format = file_format or detect_format(path)
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.prefetch_batches = prefetch_batches
+        self.title_types = set(title_types) if title_types else None
+        digest = hashlib.sha1(self.path.encode()).hexdigest()[:16]
+        self.checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{digest}.json")
+
+    def load_checkpoint(self) -> Dict:
+        """Progress from an interrupted run of the same, unchanged file"""
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        stat = os.stat(self.path)
+        if checkpoint.get('source') != self.path or checkpoint.get('size') != stat.st_size \
+                or checkpoint.get('mtime') != stat.st_mtime:
+            print("⚠️ CineRAG-AI import source changed since the last run; starting over")
+            return {}
+        return checkpoint
+
+    def save_checkpoint(self, progress: Dict):
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        stat = os.stat(self.path)
+        checkpoint = dict(progress, source=self.path, size=stat.st_size, mtime=stat.st_mtime)
+        write_file_atomically(self.checkpoint_path, lambda f: json.dump(checkpoint, f), mode='w')
+
+    def batches(self, skip_records: int, stop: threading.Event) -> Iterator[Tuple[List[Movie], List[tuple], int, int]]:
+        """
+        Parse and normalize batches of new movies
+
+        Each batch comes with (record number, records rejected so far) for
+        each of its movies, then the records consumed so far and the number
+        rejected since skip_records.
+        """
+        batch, positions = [], []
+        seen = set()  # Titles queued but not yet in the catalog, i.e. still in flight
+        consumed = rejected = 0
+        for consumed, record in enumerate(read_records(self.path, self.file_format), 1):
+            if stop.is_set():
+                return
+            if consumed <= skip_records:
+                continue
+            movie = normalize_record(record, self.title_types)
+            key = normalize_title(movie.title) if movie else None
+            if movie is None:
+                rejected += 1
+            elif key not in seen and self.cinerag.title_index.movie_id(movie.title) is None:
+                seen.add(key)
+                batch.append(movie)
+                positions.append((consumed, rejected))
+            if len(batch) >= self.batch_size:
+                yield batch, positions, consumed, rejected
+                batch, positions = [], []
+                # Stored batches are covered by the title index, so only the queued ones stay
+                title_index = self.cinerag.title_index
+                seen = {key for key in seen if title_index.movie_id(key) is None}
+        yield batch, positions, consumed, rejected
+
+    def run(self, limit: int = None) -> Dict:
+        """Import the file (resuming if possible) and return the final progress counters"""
+        progress = {'records': 0, 'added': 0, 'rejected': 0, 'complete': False}
+        progress.update(self.load_checkpoint())
+        if progress['complete']:
+            print(f"✅ CineRAG-AI already imported {self.path} ({progress['added']} movies)")
+            return progress
+        if progress['records']:
+            print(f"↩️ CineRAG-AI resuming import after {progress['records']:,} records")
+
+        # Parser thread → bounded queue → encoder (this thread)
+        batches = queue.Queue(maxsize=self.prefetch_batches)
+        stop = threading.Event()
+        skip_records = progress['records']
+        rejected_before = progress['rejected']
+
+        def offer(item) -> bool:
+            # Blocks while the encoder is behind, but gives up once it stops
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def parse():
+            try:
+                for item in self.batches(skip_records, stop):
+                    if not offer(item):
+                        return
+            except Exception as e:
+                offer(e)
+            offer(None)
+
+        parser = threading.Thread(target=parse, name='cinerag-import-parser', daemon=True)
+        parser.start()
+
+        started = time.perf_counter()
+        added_this_run = 0
+        last_checkpoint = progress['records']
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    progress['complete'] = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                batch, positions, consumed, rejected = item
+                if limit is not None and len(batch) > limit - added_this_run:
+                    # Resume right after the last movie actually added
+                    batch = batch[:limit - added_this_run]
+                    consumed, rejected = positions[len(batch) - 1] if batch else (progress['records'], 0)
+                added = self.cinerag.add_movie_batch(batch)
+                added_this_run += added
+                progress['added'] += added
+                progress['records'] = consumed
+                progress['rejected'] = rejected_before + rejected
+
+                if progress['records'] - last_checkpoint >= self.checkpoint_every:
+                    self.checkpoint(progress)
+                    last_checkpoint = progress['records']
+                    rate = added_this_run / (time.perf_counter() - started)
+                    print(f"🎬 CineRAG-AI imported {progress['added']:,} movies "
+                          f"({progress['records']:,} records, {rate:,.0f} movies/s)")
+                if limit is not None and added_this_run >= limit:
+                    break
+        finally:
+            stop.set()
+            self.checkpoint(progress)
+
+        print(f"✅ CineRAG-AI import {'finished' if progress['complete'] else 'paused'}: "
+              f"{progress['added']:,} movies added, {progress['rejected']:,} records rejected")
+        return progress
+
+    def checkpoint(self, progress: Dict):
+        """Persist the catalog first, then the progress that it covers"""
+        self.cinerag.save_system_data()
+        self.save_checkpoint(progress)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a CSV/TSV/JSONL movie dump into CineRAG-AI")
+    parser.add_argument('path', help="Dump to import (may be gzipped, e.g. IMDb title.basics.tsv.gz)")
+    parser.add_argument('--format', choices=('csv', 'tsv', 'jsonl'), help="Defaults to the file extension")
+    parser.add_argument('--batch-size', type=int, default=256, help="Movies per encoder call")
+    parser.add_argument('--checkpoint-every', type=int, default=100_000,
+                        help="Records between saves of the catalog and import progress")
+    parser.add_argument('--prefetch-batches', type=int, default=8,
+                        help="Parsed batches buffered ahead of the encoder")
+    parser.add_argument('--title-types', help="Comma-separated IMDb titleType values to keep, e.g. movie,tvMovie")
+    parser.add_argument('--limit', type=int, help="Stop after adding this many movies")
+    parser.add_argument('--restart', action='store_true', help="Ignore saved progress and start from the top")
+    add_encoder_arguments(parser)
+    args = parser.parse_args()
+    if not os.path.isfile(args.path):
+        parser.error(f"no such file: {args.path}")
+
+    cinerag = CineRAGAI(preload_model=True, ai_model=encoder_from_args(parser, args), reencode=args.reencode)
+    importer = CatalogImporter(cinerag, args.path, args.format, args.batch_size, args.checkpoint_every,
+                               args.prefetch_batches, args.title_types.split(',') if args.title_types else None)
+    if args.restart and os.path.exists(importer.checkpoint_path):
+        os.remove(importer.checkpoint_path)
+    try:
+        importer.run(args.limit)
+    except KeyboardInterrupt:
+        print("⏸️ CineRAG-AI import interrupted; rerun the same command to resume")
+        sys.exit(1)
+    finally:
+        cinerag.interaction_log.close()
+
+if __name__ == "__main__":
+    main()
@@ -3,34 +3,1851 @@
 
 import json
 import os
-from typing import List, Dict
+import re
+import sys
+import hashlib
+import base64
+import bisect
+import difflib
+import itertools
+import threading
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Dict, Tuple
 from dataclasses import dataclass
 import pickle
+import shutil
+import time
 from datetime import datetime
 
-# Advanced AI libraries for intelligent movie recommendations
+# NumPy powers the vector engine; the AI model libraries (sentence-transformers
+# and torch) are only imported when the model is first needed
 try:
-    import requests
-    from sentence_transformers import SentenceTransformer
     import numpy as np
 except ImportError:
     print("📦 Please install required packages for CineRAG-AI:")
     print("pip install -r requirements.txt")
-    print("These packages power the AI functionality! 🤖")
-    exit()
+    raise
+
+# Persistent storage layout: each catalog save writes a snapshot directory of
+# raw .npy files (embeddings and movie metadata columns, memory-mapped on load)
+# plus its indexes; catalog.json names the current snapshot
+DATA_DIR = 'cinerag_ai_data'
+CATALOG_FILE = os.path.join(DATA_DIR, 'catalog.json')
+CATALOG_SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshot')  # Each save writes snapshot-<id>/
+# Files of a snapshot (see snapshot_files); saves before snapshots kept them in DATA_DIR
+EMBEDDINGS_FILE = os.path.join(DATA_DIR, 'embeddings.npy')
+ANN_INDEX_FILE = os.path.join(DATA_DIR, 'ann_index.npz')
+LEXICAL_INDEX_FILE = os.path.join(DATA_DIR, 'lexical_index.npz')
+QUANTIZED_FILE = os.path.join(DATA_DIR, 'quantized.npz')
+TITLE_INDEX_FILE = os.path.join(DATA_DIR, 'title_index.npz')
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+PROFILE_STATE_FILE = os.path.join(PROFILES_DIR, 'state.json')
+INTERACTION_LOG_FILE = os.path.join(DATA_DIR, 'interactions.log')
+LOG_COMPACT_EVENTS = 1000  # Flush profiles once the log holds this many events
+DEFAULT_USER = 'default'  # Profile used by the interactive CLI
+PROFILE_HISTORY_LENGTH = 20  # Recent interactions kept in each profile
+EMBEDDING_CACHE_DIR = os.path.join(DATA_DIR, 'embedding_cache')
+LEGACY_DATA_FILE = 'cinerag_ai_data.pkl'
+SYSTEM_VERSION = 'CineRAG-AI v1.0'
+RECOMMENDATION_CENTROIDS = 4  # Taste clusters used by multi-centroid recommendations
+SCORE_CHUNK_ELEMENTS = 1 << 24  # Max query x catalog scores held at once (64MB float32)
+SHARD_MIN_ROWS = 50_000  # Smallest shard worth handing to a search worker
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Stage histogram bounds (seconds)
+NULL_TIMER = nullcontext()  # Shared stage timer used while metrics are disabled
+BM25_K1 = 1.2  # Term frequency saturation
+BM25_B = 0.75  # Document length normalization
+TITLE_TERM_WEIGHT = 2  # A title term counts as this many genre/description terms
+TITLE_ARTICLES = ('the', 'a', 'an')  # Leading words a title query may omit
+RRF_K = 60  # Reciprocal rank fusion damping constant
+RRF_DEPTH = 50  # Ranks each retriever contributes to hybrid fusion
+PQ_CENTROIDS = 256  # Codebook entries per PQ subvector (one byte per code)
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+def write_file_atomically(path: str, write, mode: str = 'wb'):
+    """Write through a temporary file and rename, so readers never see partial data"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, mode) as f:
+        write(f)
+    os.replace(temp_path, path)
+
+def snapshot_files(directory: str = None) -> Tuple[str, str, str, str, str]:
+    """Embeddings, ANN index, quantized codes, lexical index and title index paths of a catalog snapshot"""
+    paths = (EMBEDDINGS_FILE, ANN_INDEX_FILE, QUANTIZED_FILE, LEXICAL_INDEX_FILE, TITLE_INDEX_FILE)
+    if directory and os.path.exists(os.path.join(directory, os.path.basename(EMBEDDINGS_FILE))):
+        return tuple(os.path.join(directory, os.path.basename(path)) for path in paths)
+    # Saves before snapshots (or with only the metadata columns in one) kept these in DATA_DIR
+    return paths
+
+def load_sentence_transformer(model_name: str):
+    """Import sentence-transformers and load the model (the slow part of startup)"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError("📦 CineRAG-AI needs sentence-transformers for AI encoding: "
+                          "pip install -r requirements.txt") from e
+    print("🤖 Loading advanced AI models... (this may take a moment)")
+    return SentenceTransformer(model_name)
+
+class SentenceTransformerEncoder:
+    """The sentence-transformers model on PyTorch, loaded on first use (the default backend)"""
+    
+    def __init__(self, model_name: str = MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def identity(self) -> str:
+        # The bare model name, as embedding caches and catalogs recorded before backends existed
+        return self.model_name
+    
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = load_sentence_transformer(self.model_name)
+        return self._model
+    
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        return self.load().encode(texts, batch_size=batch_size)
+
+class ONNXEncoder:
+    """
+    The same transformer exported to ONNX and run by ONNX Runtime on CPU
+    
+    model_path is an exported model file (e.g. from `optimum-cli export
+    onnx --model sentence-transformers/all-MiniLM-L6-v2 minilm/`) with its
+    tokenizer.json alongside. quantize() writes a dynamically
+    int8-quantized copy, usually two to three times faster on CPU for a
+    small loss in accuracy. Token embeddings are mean-pooled over the
+    attention mask, as the sentence-transformers pipeline does, so the
+    unquantized model reproduces its vectors.
+    """
+    
+    def __init__(self, model_path: str, model_name: str = MODEL_NAME, max_length: int = 256, threads: int = 0):
+        self.model_path = model_path
+        self.model_name = model_name
+        self.max_length = max_length
+        self.threads = threads  # 0 lets ONNX Runtime pick
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+    
+    @property
+    def identity(self) -> str:
+        # The file name tells an int8 copy from the float model
+        return f"onnx/{self.model_name}/{os.path.basename(self.model_path)}"
+    
+    def load(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._load()
+        return self._session
+    
+    def _load(self):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("📦 CineRAG-AI's ONNX encoder needs ONNX Runtime: "
+                              "pip install onnxruntime tokenizers") from e
+        print("🤖 Loading ONNX AI model...")
+        tokenizer_path = os.path.join(os.path.dirname(os.path.abspath(self.model_path)), 'tokenizer.json')
+        if os.path.exists(tokenizer_path):
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+        else:
+            tokenizer = Tokenizer.from_pretrained(f"sentence-transformers/{self.model_name}")
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding(pad_id=tokenizer.token_to_id('[PAD]') or 0)
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        session = onnxruntime.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+        self._input_names = {model_input.name for model_input in session.get_inputs()}
+        self._tokenizer = tokenizer
+        self._session = session
+    
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        session = self.load()
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + batch_size])
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            inputs = {
+                'input_ids': np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                'attention_mask': attention_mask,
+                'token_type_ids': np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            }
+            token_embeddings = session.run(None, {name: inputs[name] for name in self._input_names})[0]
+            
+            # Mean pooling over real (unpadded) tokens
+            mask = attention_mask[..., None].astype(np.float32)
+            embeddings.append((token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        embeddings = np.concatenate(embeddings).astype(np.float32) if embeddings else np.zeros((0, 0), np.float32)
+        return embeddings[0] if single else embeddings
+    
+    @staticmethod
+    def quantize(model_path: str, output_path: str):
+        """Write a copy of an ONNX model with int8 weights (dynamic quantization)"""
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            raise ImportError("📦 Quantizing needs ONNX Runtime: pip install onnxruntime") from e
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+
+class HashingEncoder:
+    """
+    Deterministic, dependency-free encoder for offline use and tests
+    
+    Each word is hashed to a few signed dimensions of a fixed-size vector
+    and a text's embedding sums them weighted by sublinear term frequency
+    (1 + log tf): a random projection of its TF vector. Texts sharing words
+    score as similar but there is no semantic understanding. Needs no
+    download and gives identical vectors on every run and machine.
+    """
+    
+    WORD_CACHE_SIZE = 100_000  # Hashed words remembered per encoder
+    
+    def __init__(self, dimension: int = 384, features_per_word: int = 8):
+        self.dimension = dimension
+        self.features_per_word = features_per_word
+        # Per instance, so each encoder has its own budget and is not kept alive by a class-level cache
+        self.word_features = lru_cache(maxsize=self.WORD_CACHE_SIZE)(self.hash_word)
+    
+    @property
+    def identity(self) -> str:
+        return f"hashing/{self.dimension}x{self.features_per_word}"
+    
+    def load(self):
+        return self
+    
+    def hash_word(self, word: str):
+        """Dimensions and signs a word adds to an embedding"""
+        digest = hashlib.blake2b(word.encode(), digest_size=2 * self.features_per_word).digest()
+        values = np.frombuffer(digest, dtype=np.uint16)
+        signs = np.where(values & 0x8000, 1.0, -1.0).astype(np.float32)
+        return (values % self.dimension).astype(np.int64), signs
+    
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words, counts = np.unique(tokenize(text), return_counts=True)
+            for word, count in zip(words.tolist(), counts.tolist()):
+                columns, signs = self.word_features(word)
+                np.add.at(embeddings[row], columns, signs * (1.0 + np.log(count)))
+        return embeddings[0] if single else embeddings
+
+# Encoder backends selectable by name
+ENCODER_BACKENDS = {
+    'sentence-transformers': SentenceTransformerEncoder,
+    'onnx': ONNXEncoder,
+    'hashing': HashingEncoder
+}
+
+def create_encoder(backend: str = 'sentence-transformers', **options):
+    """Build an encoder backend by name; options go to its constructor"""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}' (choose from {', '.join(ENCODER_BACKENDS)})")
+    return ENCODER_BACKENDS[backend](**options)
+
+def encoder_identity(encoder) -> str:
+    """What produced an embedding space: backend, model and variant"""
+    return getattr(encoder, 'identity', type(encoder).__name__)
+
+class EncoderMismatchError(ValueError):
+    """Saved embeddings came from another encoder than the one in use"""
+
+def add_encoder_arguments(parser):
+    """--encoder / --onnx-model / --reencode options shared by the command-line tools"""
+    parser.add_argument('--encoder', choices=list(ENCODER_BACKENDS), default='sentence-transformers',
+                        help="Embedding backend; 'hashing' runs fully offline")
+    parser.add_argument('--onnx-model', help="Exported (optionally int8-quantized) ONNX model for --encoder onnx")
+    parser.add_argument('--reencode', action='store_true',
+                        help="Re-embed a catalog saved with a different encoder instead of refusing to load it")
+
+def encoder_from_args(parser, args):
+    if args.encoder == 'onnx' and not args.onnx_model:
+        parser.error("--encoder onnx needs --onnx-model")
+    return create_encoder(args.encoder, **({'model_path': args.onnx_model} if args.encoder == 'onnx' else {}))
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Compact JSON-safe form of a float32 vector"""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode('ascii')
+
+def decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).copy()
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key for query text (the MiniLM encoder is uncased)"""
+    return " ".join(query.lower().split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens for keyword matching"""
+    return re.findall(r"\w+", text.lower())
+
+def normalize_title(title: str) -> str:
+    """Title key that ignores case, punctuation and spacing"""
+    return " ".join(tokenize(title))
 
-@dataclass
 class Movie:
-    """Enhanced movie data structure for CineRAG-AI"""
-    title: str
-    year: str
-    genre: str
-    rating: float
-    description: str
-    poster_url: str = ""
+    """
+    Enhanced movie data structure for CineRAG-AI
+    
+    A small slotted record: the catalog itself is stored column-wise
+    (see MovieCatalog) and Movie objects are only built for the rows a
+    caller reads.
+    """
+    
+    __slots__ = ('title', 'year', 'genre', 'rating', 'description', 'poster_url')
+    
+    def __init__(self, title: str, year: str, genre: str, rating: float, description: str, poster_url: str = ""):
+        self.title = title
+        self.year = year
+        self.genre = genre
+        self.rating = rating
+        self.description = description
+        self.poster_url = poster_url
+    
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Movie({fields})"
+    
+    def __eq__(self, other):
+        return self.astuple() == other.astuple() if isinstance(other, Movie) else NotImplemented
+    
+    __hash__ = None  # Mutable, like the dataclass it replaced
+    
+    def __setstate__(self, state):
+        # Pickles written before Movie had __slots__ carry an instance __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def asdict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
     
     def __str__(self):
         return f"{self.title} ({self.year}) - {self.genre} - ⭐{self.rating}/10"
+    
+    def embedding_text(self) -> str:
+        """Comprehensive content the AI model encodes for this movie"""
+        return f"{self.title} {self.genre} {self.description}"
+
+@dataclass
+class SearchFilters:
+    """Structured constraints applied before vector scoring"""
+    genres: List[str] = None  # Movie must have at least one of these genres
+    year_min: int = None
+    year_max: int = None
+    min_rating: float = None
+    
+    def is_empty(self) -> bool:
+        return not self.genres and self.year_min is None and self.year_max is None and self.min_rating is None
+    
+    def cache_key(self) -> tuple:
+        """Hashable form of the filters, for result caching"""
+        genres = tuple(sorted({genre.strip().lower() for genre in self.genres})) if self.genres else None
+        return (genres, self.year_min, self.year_max, self.min_rating)
+
+class StringColumn:
+    """
+    Append-only column of strings packed into one UTF-8 buffer
+    
+    Saves the Python str object (about 50 bytes of overhead) per value;
+    a string is decoded only when its row is read. A saved column is the
+    buffer and its offsets as two .npy files, memory-mapped on load and
+    copied into memory only when rows are appended.
+    """
+    
+    __slots__ = ('_data', '_offsets', '_replaced')
+    
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('q', [0])  # Row i spans _data[_offsets[i]:_offsets[i + 1]]
+        self._replaced: Dict[int, str] = {}  # Rows overwritten since loading (rare)
+    
+    @classmethod
+    def load(cls, path: str) -> 'StringColumn':
+        """Memory-map a column written by save() (path without the .npy suffix)"""
+        # Plain memoryviews of the maps: slicing them is much cheaper than slicing np.memmap
+        column = cls()
+        column._data = memoryview(np.load(f"{path}.npy", mmap_mode='r'))
+        column._offsets = memoryview(np.load(f"{path}_offsets.npy", mmap_mode='r'))
+        return column
+    
+    def __len__(self):
+        return len(self._offsets) - 1
+    
+    def __getitem__(self, row: int) -> str:
+        if self._replaced and row in self._replaced:
+            return self._replaced[row]
+        return bytes(self._data[self._offsets[row]:self._offsets[row + 1]]).decode()
+    
+    def __setitem__(self, row: int, value: str):
+        if not 0 <= row < len(self):
+            raise IndexError(f"string column row {row} out of range")
+        self._replaced[row] = value
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+    
+    def append(self, value: str):
+        if not isinstance(self._data, bytearray):
+            # Detach from the read-only memmap
+            self._data = bytearray(self._data)
+            self._offsets = array('q', self._offsets.tobytes())
+        self._data += value.encode()
+        self._offsets.append(len(self._data))
+    
+    def save(self, path: str):
+        """Write the buffer and offsets as path.npy and path_offsets.npy, folding in replaced rows"""
+        data, offsets = self._data, self._offsets
+        if self._replaced:
+            values = [self[row].encode() for row in range(len(self))]
+            data = b''.join(values)
+            offsets = np.concatenate(([0], np.cumsum([len(value) for value in values], dtype=np.int64)))
+        np.save(f"{path}.npy", np.frombuffer(data, dtype=np.uint8))
+        np.save(f"{path}_offsets.npy", np.asarray(offsets, dtype=np.int64))
+
+def parse_year(year) -> int:
+    """Numeric release year, or -1 when unknown (never matches a year range)"""
+    try:
+        return int(str(year)[:4])
+    except ValueError:
+        return -1
+
+class MovieCatalog:
+    """
+    Column-oriented movie catalog
+    
+    Instead of one object per movie, each field is a column: years and
+    ratings are NumPy arrays, genres are codes into a table of distinct
+    genre strings, and titles, descriptions and poster URLs are packed
+    string columns. A row costs a few dozen bytes plus its text, and
+    metadata filters run vectorized over whole columns. Indexing builds a
+    Movie from its row, so callers should only do that for the movies
+    they return or display.
+    
+    Saved catalogs are a directory of .npy columns that load() maps
+    read-only, like the embeddings; a column is copied into memory on the
+    first change to it.
+    """
+    
+    NUMERIC_COLUMNS = ('_years', '_ratings', '_genres')
+    STRING_COLUMNS = ('titles', 'descriptions', 'poster_urls')
+    
+    def __init__(self, movies=()):
+        self.titles = StringColumn()
+        self.descriptions = StringColumn()
+        self.poster_urls = StringColumn()
+        self.genre_names: List[str] = []  # Genre code -> genre string, e.g. 'Action/Adventure'
+        self._genre_codes: Dict[str, int] = {}
+        self._years = np.empty(0, dtype=np.int32)
+        self._ratings = np.empty(0, dtype=np.float64)
+        self._genres = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self.version = 0  # Bumped on every change, for caches derived from the columns
+        self.extend(movies)
+    
+    @classmethod
+    def load(cls, directory: str) -> 'MovieCatalog':
+        """Memory-map a catalog written by save()"""
+        catalog = cls()
+        for name in cls.STRING_COLUMNS:
+            setattr(catalog, name, StringColumn.load(os.path.join(directory, name)))
+        for name in cls.NUMERIC_COLUMNS:
+            setattr(catalog, name, np.load(os.path.join(directory, f"{name[1:]}.npy"), mmap_mode='r'))
+        with open(os.path.join(directory, 'genre_names.json')) as f:
+            for genre in json.load(f):
+                catalog.genre_code(genre)
+        catalog._size = len(catalog.titles)
+        return catalog
+    
+    def save(self, directory: str):
+        """Write every column into directory (which should be new: mapped files are not replaced in place)"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.STRING_COLUMNS:
+            getattr(self, name).save(os.path.join(directory, name))
+        for name in self.NUMERIC_COLUMNS:
+            np.save(os.path.join(directory, f"{name[1:]}.npy"), getattr(self, name)[:self._size])
+        with open(os.path.join(directory, 'genre_names.json'), 'w') as f:
+            json.dump(self.genre_names, f)
+    
+    def __len__(self):
+        return self._size
+    
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._size))]
+        row = int(row)
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError(f"catalog row {row} out of range")
+        year = int(self._years[row])
+        return Movie(self.titles[row], str(year) if year >= 0 else '', self.genre_names[self._genres[row]],
+                     float(self._ratings[row]), self.descriptions[row], self.poster_urls[row])
+    
+    def __setitem__(self, row: int, movie: Movie):
+        """Overwrite a row in place, keeping its movie ID"""
+        if not 0 <= row < self._size:
+            raise IndexError(f"catalog row {row} out of range")
+        for name in self.NUMERIC_COLUMNS:
+            if not getattr(self, name).flags.writeable:
+                setattr(self, name, np.array(getattr(self, name)))  # Detach from the read-only memmap
+        self.titles[row] = movie.title
+        self.descriptions[row] = movie.description
+        self.poster_urls[row] = movie.poster_url
+        self._years[row] = parse_year(movie.year)
+        self._ratings[row] = float(movie.rating)
+        self._genres[row] = self.genre_code(movie.genre)
+        self.version += 1
+    
+    def __iter__(self):
+        return (self[row] for row in range(self._size))
+    
+    @property
+    def years(self) -> np.ndarray:
+        return self._years[:self._size]
+    
+    @property
+    def ratings(self) -> np.ndarray:
+        return self._ratings[:self._size]
+    
+    @property
+    def genre_codes(self) -> np.ndarray:
+        return self._genres[:self._size]
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns"""
+        return (self.titles.nbytes + self.descriptions.nbytes + self.poster_urls.nbytes
+                + self._years.nbytes + self._ratings.nbytes + self._genres.nbytes)
+    
+    def append(self, movie: Movie):
+        self.extend([movie])
+    
+    def extend(self, movies):
+        movies = list(movies)
+        self._reserve(self._size + len(movies))
+        for row, movie in enumerate(movies, self._size):
+            self.titles.append(movie.title)
+            self.descriptions.append(movie.description)
+            self.poster_urls.append(movie.poster_url)
+            self._years[row] = parse_year(movie.year)
+            self._ratings[row] = float(movie.rating)
+            self._genres[row] = self.genre_code(movie.genre)
+        self._size += len(movies)
+        self.version += 1
+    
+    def genre_code(self, genre: str) -> int:
+        code = self._genre_codes.get(genre)
+        if code is None:
+            code = self._genre_codes[genre] = len(self.genre_names)
+            self.genre_names.append(genre)
+        return code
+    
+    def _reserve(self, size: int):
+        if size <= len(self._years):
+            return
+        capacity = max(size, 2 * len(self._years), 64)
+        for name in self.NUMERIC_COLUMNS:
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+class MetadataIndex:
+    """
+    Vectorized metadata filters over the catalog columns
+    
+    A genre's mask is found by matching the genre against the catalog's
+    distinct genre strings, then testing the code column for those codes.
+    Year/rating range filters are two binary searches in sorted copies of
+    the columns. Masks and sorted copies are cached and rebuilt lazily
+    once the catalog changes.
+    """
+    
+    def __init__(self, catalog: MovieCatalog):
+        self.catalog = catalog
+        self._indexed_version = -1
+        self._genre_masks: Dict[str, np.ndarray] = {}
+        self._columns = None  # (year_order, sorted_years, rating_order, sorted_ratings)
+    
+    def __len__(self):
+        return len(self.catalog)
+    
+    def genre_mask(self, genres, rows=slice(None)) -> np.ndarray:
+        """Boolean mask over the catalog (or just the given rows) of movies in any of the genres"""
+        mask = np.zeros(self.catalog.genre_codes[rows].shape, dtype=bool)  # Sized like the rows, not the catalog
+        for genre in genres:
+            mask |= self._genre_mask(genre.strip().lower())[rows]
+        return mask
+    
+    def filter_mask(self, filters: SearchFilters) -> np.ndarray:
+        """Rows satisfying every filter, or None when there is nothing to filter"""
+        if filters is None or filters.is_empty():
+            return None
+        
+        mask = np.ones(len(self), dtype=bool)
+        if filters.genres:
+            mask &= self.genre_mask(filters.genres)
+        
+        year_order, sorted_years, rating_order, sorted_ratings = self._sorted_columns()
+        if filters.year_min is not None or filters.year_max is not None:
+            low = np.searchsorted(sorted_years, filters.year_min if filters.year_min is not None else 0, 'left')
+            high = np.searchsorted(sorted_years, filters.year_max if filters.year_max is not None else np.iinfo(np.int32).max, 'right')
+            mask &= self._rows_mask(year_order[low:high])
+        if filters.min_rating is not None:
+            mask &= self._rows_mask(rating_order[np.searchsorted(sorted_ratings, filters.min_rating, 'left'):])
+        return mask
+    
+    def _genre_mask(self, genre: str) -> np.ndarray:
+        self._refresh()
+        mask = self._genre_masks.get(genre)
+        if mask is None:
+            codes = [code for code, name in enumerate(self.catalog.genre_names)
+                     if genre in (part.strip().lower() for part in name.split('/'))]
+            mask = np.isin(self.catalog.genre_codes, codes)
+            self._genre_masks[genre] = mask
+        return mask
+    
+    def _refresh(self):
+        """Drop cached masks and sorted columns once the catalog has changed"""
+        if self._indexed_version != self.catalog.version:
+            self._genre_masks = {}
+            self._columns = None
+            self._indexed_version = self.catalog.version
+    
+    def _rows_mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows] = True
+        return mask
+    
+    def _sorted_columns(self):
+        self._refresh()
+        if self._columns is None:
+            years = self.catalog.years.copy()
+            ratings = self.catalog.ratings.copy()
+            year_order = np.argsort(years, kind='stable')
+            rating_order = np.argsort(ratings, kind='stable')
+            self._columns = (year_order, years[year_order], rating_order, ratings[rating_order])
+        return self._columns
+
+def title_trigrams(key: str) -> set:
+    """Character trigrams of a normalized title, padded so word edges count"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    """
+    Constant-time title lookups with fuzzy fallback
+    
+    Titles are keyed by normalize_title(), so lookups ignore case,
+    punctuation and spacing, and a title is also found without its
+    leading article ("Batman" → "The Batman"). A key identifies one movie:
+    re-adding the same title updates that movie rather than duplicating
+    it, so movie IDs (catalog rows) stay stable.
+    
+    The normalized keys are saved with the catalog, so loading splits one
+    buffer into the lookup dicts instead of normalizing every title again.
+    
+    Misspelled titles are matched through a character-trigram inverted
+    index, built lazily on the first fuzzy query from the catalog's title
+    column: candidates sharing trigrams with the query are counted in one
+    pass over the matching postings, and the best by trigram Jaccard
+    similarity are re-ranked by edit similarity, which also catches
+    transposed letters in short titles.
+    """
+    
+    FUZZY_CANDIDATES = 50  # Trigram matches re-ranked by edit similarity
+    
+    def __init__(self, titles: StringColumn):
+        self.titles = titles  # The catalog's title column, read by the fuzzy index
+        self.ids: Dict[str, int] = {}  # Normalized title -> movie ID
+        self.aliases: Dict[str, int] = {}  # Normalized title without its leading article -> movie ID
+        self.trigrams: Dict[str, array] = {}  # Trigram -> movie IDs, in ID order
+        self._trigram_counts = array('H')  # Distinct trigrams per indexed movie ID
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def save(self, path: str, snapshot: str = ''):
+        """Persist the normalized keys and their movie IDs, tagged with the catalog snapshot they index"""
+        def packed(keys: Dict[str, int]) -> Dict[str, np.ndarray]:
+            return {'keys': np.frombuffer('\n'.join(keys).encode(), dtype=np.uint8),
+                    'ids': np.fromiter(keys.values(), dtype=np.int64, count=len(keys))}
+        ids, aliases = packed(self.ids), packed(self.aliases)
+        write_file_atomically(path, lambda f: np.savez(
+            f, keys=ids['keys'], ids=ids['ids'], alias_keys=aliases['keys'], alias_ids=aliases['ids'],
+            rows=np.array(len(self.titles)), snapshot=np.array(snapshot)))
+    
+    @classmethod
+    def load(cls, path: str, titles: StringColumn, snapshot: str = '') -> 'TitleIndex':
+        """Restore keys written by save(), or None if they index another catalog snapshot"""
+        def unpacked(keys: np.ndarray, ids: np.ndarray) -> Dict[str, int]:
+            # Splitting an empty buffer would give one empty key
+            return dict(zip(keys.tobytes().decode().split('\n'), ids.tolist())) if len(ids) else {}
+        with np.load(path) as data:
+            if str(data['snapshot']) != snapshot or int(data['rows']) != len(titles):
+                return None
+            index = cls(titles)
+            index.ids = unpacked(data['keys'], data['ids'])
+            index.aliases = unpacked(data['alias_keys'], data['alias_ids'])
+        return index
+    
+    def __contains__(self, title: str) -> bool:
+        return self.lookup(title) is not None
+    
+    def movie_id(self, title: str) -> int:
+        """ID of the movie with exactly this normalized title, or None"""
+        return self.ids.get(normalize_title(title))
+    
+    def lookup(self, title: str) -> int:
+        """ID of the movie with this title, ignoring case, punctuation and a leading article; or None"""
+        key = normalize_title(title)
+        movie_id = self.ids.get(key)
+        if movie_id is None:
+            movie_id = self.aliases.get(key)
+        if movie_id is None:
+            first, _, rest = key.partition(' ')
+            if first in TITLE_ARTICLES and rest:
+                movie_id = self.ids.get(rest, self.aliases.get(rest))
+        return movie_id
+    
+    def add(self, movie_id: int, title: str):
+        """Register a movie's title; the first movie with a given key keeps it"""
+        key = normalize_title(title)
+        self.ids.setdefault(key, movie_id)
+        first, _, rest = key.partition(' ')
+        if first in TITLE_ARTICLES and rest:
+            self.aliases.setdefault(rest, movie_id)
+    
+    def fuzzy(self, query: str, limit: int = 5, min_similarity: float = 0.6) -> List[tuple]:
+        """(movie ID, similarity) of the titles most like the query, best first"""
+        self._index_trigrams()
+        key = normalize_title(query)
+        grams = title_trigrams(key)
+        parts = [np.frombuffer(self.trigrams[gram], dtype=np.int32) for gram in grams if gram in self.trigrams]
+        if not parts:
+            return []
+        
+        candidates, shared = np.unique(np.concatenate(parts), return_counts=True)
+        sizes = np.frombuffer(self._trigram_counts, dtype=np.uint16)[candidates]
+        jaccard = shared / (len(grams) + sizes - shared)
+        matches = []
+        for movie_id in candidates[top_k_indices(jaccard, self.FUZZY_CANDIDATES)].tolist():
+            similarity = difflib.SequenceMatcher(None, key, normalize_title(self.titles[movie_id])).ratio()
+            if similarity >= min_similarity:
+                matches.append((movie_id, similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches[:limit]
+    
+    def _index_trigrams(self):
+        """Add trigram postings for catalog rows appended since the last fuzzy query"""
+        with self._lock:
+            for movie_id in range(len(self._trigram_counts), len(self.titles)):
+                grams = title_trigrams(normalize_title(self.titles[movie_id]))
+                for gram in grams:
+                    self.trigrams.setdefault(gram, array('i')).append(movie_id)
+                self._trigram_counts.append(min(len(grams), 0xFFFF))
+
+class LexicalIndex:
+    """
+    BM25 inverted index over movie titles, genres and descriptions
+    
+    Each term's postings are a pair of compact arrays (rows, weighted term
+    frequencies) kept in row order and viewed as NumPy arrays at query
+    time, so a query only touches the postings of its own terms.
+    
+    The postings are saved with the catalog as flat arrays, one run per
+    term. Loading keeps those runs as they are, so startup does not
+    re-tokenize the catalog or rebuild per-term arrays; a saved term is
+    only copied into its own arrays once an update changes its postings.
+    """
+    
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, tuple] = {}  # Term -> (array('i') rows, array('f') frequencies)
+        self._lengths = array('f')  # Weighted term count per row
+        self._total_length = 0.0
+        # Loaded postings not yet changed: term -> run number, run bounds, and the flat rows/frequencies
+        self._saved_terms: Dict[str, int] = {}
+        self._saved_bounds = np.zeros(1, dtype=np.int64)
+        self._saved_rows = np.empty(0, dtype=np.int32)
+        self._saved_frequencies = np.empty(0, dtype=np.float32)
+    
+    def __len__(self):
+        return len(self._lengths)
+    
+    def save(self, path: str, snapshot: str = ''):
+        """Persist the postings as flat arrays, tagged with the catalog snapshot they index"""
+        terms = list(self._saved_terms) + list(self.postings)
+        postings = [self.term_postings(term) for term in terms]
+        sizes = np.array([len(rows) for rows, _ in postings], dtype=np.int64)
+        rows = np.frombuffer(b''.join(rows.tobytes() for rows, _ in postings), dtype=np.int32)
+        frequencies = np.frombuffer(b''.join(frequencies.tobytes() for _, frequencies in postings), dtype=np.float32)
+        write_file_atomically(path, lambda f: np.savez(
+            f, terms=np.frombuffer('\n'.join(terms).encode(), dtype=np.uint8), sizes=sizes, rows=rows,
+            frequencies=frequencies, lengths=np.frombuffer(self._lengths, dtype=np.float32),
+            settings=np.array([self.k1, self.b]), snapshot=np.array(snapshot)))
+    
+    @classmethod
+    def load(cls, path: str, snapshot: str = '') -> 'LexicalIndex':
+        """Restore postings written by save(), or None if they index another catalog snapshot"""
+        with np.load(path) as data:
+            if str(data['snapshot']) != snapshot:
+                return None
+            index = cls(*data['settings'].tolist())
+            terms = data['terms'].tobytes().decode().split('\n') if len(data['terms']) else []
+            index._saved_terms = dict(zip(terms, range(len(terms))))
+            index._saved_bounds = np.concatenate(([0], np.cumsum(data['sizes'])))
+            index._saved_rows = data['rows']
+            index._saved_frequencies = data['frequencies']
+            lengths = data['lengths']
+        index._lengths = array('f', lengths.tobytes())
+        index._total_length = float(lengths.sum(dtype=np.float64))
+        return index
+    
+    @staticmethod
+    def term_counts(movie: Movie) -> Dict[str, float]:
+        """Weighted term frequencies of a movie; title words count extra"""
+        counts: Dict[str, float] = {}
+        for token in tokenize(movie.title):
+            counts[token] = counts.get(token, 0.0) + TITLE_TERM_WEIGHT
+        for token in tokenize(f"{movie.genre} {movie.description}"):
+            counts[token] = counts.get(token, 0.0) + 1.0
+        return counts
+    
+    def term_postings(self, term: str):
+        """A term's (rows, frequencies), as arrays or NumPy views of the loaded runs; None if unindexed"""
+        postings = self.postings.get(term)
+        if postings is None and term in self._saved_terms:
+            run = self._saved_terms[term]
+            start, end = self._saved_bounds[run], self._saved_bounds[run + 1]
+            postings = (self._saved_rows[start:end], self._saved_frequencies[start:end])
+        return postings
+    
+    def add(self, row: int, movie: Movie):
+        """Index the next catalog row; rows must arrive in order"""
+        counts = self.term_counts(movie)
+        for term, count in counts.items():
+            rows, frequencies = self._mutable_postings(term)
+            rows.append(row)
+            frequencies.append(count)
+        length = sum(counts.values())
+        self._lengths.append(length)
+        self._total_length += length
+    
+    def replace(self, row: int, old_movie: Movie, movie: Movie):
+        """Re-index an updated row: drop its old postings and insert the new ones in row order"""
+        for term in self.term_counts(old_movie):
+            rows, frequencies = self._mutable_postings(term)
+            position = bisect.bisect_left(rows, row)
+            del rows[position]
+            del frequencies[position]
+            if not rows:
+                del self.postings[term]
+        
+        counts = self.term_counts(movie)
+        for term, count in counts.items():
+            rows, frequencies = self._mutable_postings(term)
+            position = bisect.bisect_left(rows, row)
+            rows.insert(position, row)
+            frequencies.insert(position, count)
+        length = sum(counts.values())
+        self._total_length += length - self._lengths[row]
+        self._lengths[row] = length
+    
+    def search(self, query: str, k: int, allowed: np.ndarray = None):
+        """Rows and BM25 scores of the k best keyword matches, best first"""
+        row_parts, score_parts = [], []
+        if len(self):
+            lengths = np.frombuffer(self._lengths, dtype=np.float32)
+            average_length = self._total_length / len(self)
+            for term in set(tokenize(query)):
+                postings = self.term_postings(term)
+                if postings is None:
+                    continue
+                rows = np.frombuffer(postings[0], dtype=np.int32)
+                frequencies = np.frombuffer(postings[1], dtype=np.float32)
+                idf = np.log(1 + (len(self) - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+                row_parts.append(rows)
+                score_parts.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+        if not row_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        # Sum per-term contributions for rows matching several terms
+        rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, scores = rows[keep], scores[keep]
+        best = top_k_indices(scores, k)
+        return rows[best].astype(np.int64), scores[best]
+    
+    def _mutable_postings(self, term: str):
+        """A term's postings as growable arrays, copying a loaded run out on its first change"""
+        postings = self.postings.get(term)
+        if postings is None:
+            saved = self.term_postings(term)
+            postings = (array('i'), array('f')) if saved is None else \
+                (array('i', saved[0].tobytes()), array('f', saved[1].tobytes()))
+            self._saved_terms.pop(term, None)
+            self.postings[term] = postings
+        return postings
+
+def results_nbytes(entry) -> int:
+    """Approximate memory held by a cached (versions, [(Movie, score), ...]) entry"""
+    versions, results = entry
+    size = sys.getsizeof(entry) + sys.getsizeof(versions) + sys.getsizeof(results)
+    for result in results:
+        movie = result[0]
+        size += sys.getsizeof(result) + sys.getsizeof(result[1]) + sys.getsizeof(movie)
+        size += sum(sys.getsizeof(getattr(movie, name)) for name in Movie.__slots__)
+    return size
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """Return embeddings as a 2-D float32 array of unit-length rows"""
+    matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # Leave all-zero vectors untouched
+    return np.ascontiguousarray(matrix / norms)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without a full sort"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise top_k_indices for a 2-D score matrix"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> np.ndarray:
+    """Merge ranked row lists by summed 1 / (k + rank), best first"""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[int(row)] = scores.get(int(row), 0.0) + 1.0 / (k + rank)
+    return np.array(sorted(scores, key=scores.get, reverse=True), dtype=np.int64)
+
+def lloyd_kmeans(vectors: np.ndarray, num_clusters: int, iterations: int, seed: int, assign, update) -> np.ndarray:
+    """
+    Lloyd's algorithm with pluggable steps
+    
+    assign(vectors, centroids) gives each vector's cluster; update(sums,
+    counts) turns per-cluster vector sums and sizes into new centroids.
+    Empty clusters are re-seeded with random vectors.
+    """
+    rng = np.random.default_rng(seed)
+    num_clusters = min(num_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), num_clusters, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=num_clusters)
+        
+        # Re-seed empty clusters with random vectors
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        counts[empty] = 1
+        centroids = update(sums, counts)
+    return centroids
+
+def spherical_kmeans(vectors: np.ndarray, num_clusters: int, iterations: int = 10, seed: int = 42) -> np.ndarray:
+    """Unit-length centroids of normalized vectors, clustered by cosine similarity"""
+    return lloyd_kmeans(vectors, num_clusters, iterations, seed,
+                        assign=lambda vectors, centroids: np.argmax(vectors @ centroids.T, axis=1),
+                        update=lambda sums, counts: normalize_embeddings(sums))
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (Euclidean) for each vector"""
+    distances = (centroids ** 2).sum(axis=1) - 2 * (vectors @ centroids.T)
+    return np.argmin(distances, axis=1)
+
+def kmeans(vectors: np.ndarray, num_clusters: int, iterations: int = 10, seed: int = 42) -> np.ndarray:
+    """Euclidean k-means centroids (Lloyd's algorithm)"""
+    return lloyd_kmeans(vectors, num_clusters, iterations, seed, assign=nearest_centroids,
+                        update=lambda sums, counts: sums / counts[:, None])
+
+class EmbeddingMatrix:
+    """
+    Contiguous store of pre-normalized float32 movie embeddings
+
+    Rows are L2-normalized on the way in, so cosine similarity against the
+    whole catalog is a single matrix-vector product. Capacity grows
+    geometrically, keeping appends amortized O(1).
+    """
+    
+    def __init__(self, dimension: int = 0, capacity: int = 64):
+        self._data = np.empty((capacity, dimension), dtype=np.float32)
+        self._size = 0
+    
+    @classmethod
+    def from_array(cls, embeddings) -> 'EmbeddingMatrix':
+        """Build a matrix from saved embeddings (array or list of vectors)"""
+        store = cls()
+        if len(embeddings):
+            store.append(embeddings)
+        return store
+    
+    @classmethod
+    def from_mapped(cls, embeddings: np.ndarray) -> 'EmbeddingMatrix':
+        """Wrap already-normalized saved embeddings (e.g. a read-only memmap) without copying"""
+        store = cls()
+        if embeddings.ndim == 2:
+            store._data = embeddings
+            store._size = len(embeddings)
+        return store
+    
+    def __len__(self):
+        return self._size
+    
+    def __getitem__(self, index):
+        return self.vectors[index]
+    
+    @property
+    def dimension(self) -> int:
+        return self._data.shape[1]
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the populated rows (no copy)"""
+        return self._data[:self._size]
+    
+    def append(self, embeddings):
+        """Normalize and append one embedding or a batch of embeddings"""
+        batch = normalize_embeddings(embeddings)
+        if self._size == 0 and batch.shape[1] != self.dimension:
+            self._data = np.empty((max(len(self._data), len(batch)), batch.shape[1]), dtype=np.float32)
+        elif batch.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension {batch.shape[1]} does not match catalog dimension {self.dimension}")
+        
+        required = self._size + len(batch)
+        if required > len(self._data):
+            capacity = max(required, 2 * len(self._data))
+            grown = np.empty((capacity, self.dimension), dtype=np.float32)
+            grown[:self._size] = self.vectors
+            self._data = grown
+        
+        self._data[self._size:required] = batch
+        self._size = required
+    
+    def replace(self, row: int, embedding):
+        """Normalize and overwrite one row"""
+        if not self._data.flags.writeable:
+            self._data = np.array(self.vectors)  # Detach from the read-only memmap
+        self._data[row] = normalize_embeddings(embedding)[0]
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index
+    
+    Spherical k-means centroids partition the normalized catalog into
+    inverted lists. A query only scores the rows in its `nprobe` closest
+    lists, trading a little recall for scan work proportional to
+    nprobe / num_lists of the catalog.
+    """
+    
+    ASSIGN_CHUNK_ROWS = 65536  # Bounds the rows x centroids score matrix
+    
+    def __init__(self, num_lists: int = 0, nprobe: int = 8, train_iterations: int = 10,
+                 train_sample_size: int = 100_000, seed: int = 42):
+        self.num_lists = num_lists  # 0 picks ~sqrt(catalog size) at training time
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.train_sample_size = train_sample_size
+        self.seed = seed
+        self.centroids = None
+        self.lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    def __len__(self):
+        """Catalog rows assigned to lists"""
+        return sum(len(rows) for rows in self.lists)
+    
+    def save(self, path: str):
+        """Persist centroids and inverted lists as flat arrays"""
+        sizes = np.array([len(rows) for rows in self.lists], dtype=np.int64)
+        rows = np.fromiter(itertools.chain.from_iterable(self.lists), dtype=np.int64, count=int(sizes.sum()))
+        settings = np.array([self.num_lists, self.nprobe, self.train_iterations, self.train_sample_size, self.seed])
+        write_file_atomically(path, lambda f: np.savez(f, centroids=self.centroids, list_sizes=sizes,
+                                                       list_rows=rows, settings=settings))
+    
+    @classmethod
+    def load(cls, path: str) -> 'IVFIndex':
+        """Restore an index written by save()"""
+        with np.load(path) as data:
+            index = cls(*data['settings'].tolist())
+            index.centroids = data['centroids']
+            chunks = np.split(data['list_rows'], np.cumsum(data['list_sizes'])[:-1])
+        index.lists = [chunk.tolist() for chunk in chunks]
+        index._list_arrays = dict(enumerate(chunks))
+        return index
+    
+    def train(self, vectors: np.ndarray):
+        """Learn centroids from the catalog and assign every row to a list"""
+        rng = np.random.default_rng(self.seed)
+        num_lists = self.num_lists or max(1, int(np.sqrt(len(vectors))))
+        
+        sample = vectors
+        if len(vectors) > self.train_sample_size:
+            sample = vectors[rng.choice(len(vectors), self.train_sample_size, replace=False)]
+        
+        self.centroids = spherical_kmeans(sample, num_lists, self.train_iterations, self.seed)
+        self.lists = [[] for _ in range(len(self.centroids))]
+        self._list_arrays = {}
+        self.add(vectors, 0)
+    
+    def add(self, vectors: np.ndarray, start_row: int):
+        """Assign new catalog rows (starting at start_row) to their closest lists"""
+        if not self.is_trained:
+            return
+        vectors = np.atleast_2d(vectors)
+        for offset in range(0, len(vectors), self.ASSIGN_CHUNK_ROWS):
+            chunk = vectors[offset:offset + self.ASSIGN_CHUNK_ROWS]
+            assignments = np.argmax(chunk @ self.centroids.T, axis=1)
+            for row, list_id in enumerate(assignments.tolist(), start_row + offset):
+                self.lists[list_id].append(row)
+                self._list_arrays.pop(list_id, None)
+    
+    def replace(self, row: int, old_vector: np.ndarray, vector: np.ndarray):
+        """Move an updated row to the list closest to its new vector"""
+        if not self.is_trained:
+            return
+        old_list = int(np.argmax(self.centroids @ old_vector))
+        if row in self.lists[old_list]:
+            self.lists[old_list].remove(row)
+            self._list_arrays.pop(old_list, None)
+        self.add(vector, row)
+    
+    def candidates(self, query_embedding: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Catalog rows stored in the lists closest to the query"""
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        probed = top_k_indices(self.centroids @ query_embedding, nprobe)
+        arrays = [self._list_array(list_id) for list_id in probed.tolist()]
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+    
+    def _list_array(self, list_id: int) -> np.ndarray:
+        array = self._list_arrays.get(list_id)
+        if array is None:
+            array = np.array(self.lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+class QuantizedEmbeddings:
+    """
+    Compressed copy of the catalog embeddings used for scoring
+    
+    Kinds, with their size for 384-d vectors:
+        float16  Half-precision rows (768 bytes, 2x smaller)
+        int8     Rows scaled by their largest component into bytes, plus
+                 one float32 scale (388 bytes, ~4x smaller)
+        pq       Product quantization: rows split into num_subvectors
+                 pieces, each coded as one byte against a per-subspace
+                 k-means codebook (48 bytes at 48 subvectors, 32x smaller)
+    
+    Scores approximate inner products with the float32 rows. PQ uses
+    asymmetric distance computation: the uncompressed query is scored
+    against every codebook entry once, and a row's score is the sum of its
+    codes' table entries. The top rescore_depth rows can be re-scored
+    exactly from the float32 embeddings.
+    """
+    
+    KINDS = ('float16', 'int8', 'pq')
+    SCORE_CHUNK_ROWS = 65536  # Bounds the rows decoded at once
+    
+    def __init__(self, kind: str = 'int8', rescore_depth: int = 100, num_subvectors: int = 48,
+                 train_iterations: int = 10, train_sample_size: int = 100_000, seed: int = 42):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown quantization kind: {kind}")
+        self.kind = kind
+        self.rescore_depth = rescore_depth  # 0 keeps the approximate scores
+        self.num_subvectors = num_subvectors
+        self.train_iterations = train_iterations
+        self.train_sample_size = train_sample_size
+        self.seed = seed
+        self.codebooks = None  # pq only: (subvectors, centroids, subvector dimension)
+        self._codes = None
+        self._scales = np.empty(0, dtype=np.float32)  # int8 only
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def is_trained(self) -> bool:
+        return self._codes is not None
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes, scales and codebooks"""
+        size = 0 if self._codes is None else self._codes[:self._size].nbytes
+        size += self._scales[:self._size].nbytes
+        return size + (0 if self.codebooks is None else self.codebooks.nbytes)
+    
+    def save(self, path: str):
+        """Persist codes and codebooks as flat arrays"""
+        settings = np.array([self.KINDS.index(self.kind), self.rescore_depth, self.num_subvectors,
+                             self.train_iterations, self.train_sample_size, self.seed])
+        codebooks = self.codebooks if self.codebooks is not None else np.empty(0, dtype=np.float32)
+        write_file_atomically(path, lambda f: np.savez(f, codes=self._codes[:self._size],
+                                                       scales=self._scales[:self._size],
+                                                       codebooks=codebooks, settings=settings))
+    
+    @classmethod
+    def load(cls, path: str) -> 'QuantizedEmbeddings':
+        """Restore compressed embeddings written by save()"""
+        with np.load(path) as data:
+            kind, *settings = data['settings'].tolist()
+            store = cls(cls.KINDS[kind], *settings)
+            store._codes = data['codes']
+            store._scales = data['scales']
+            if store.kind == 'pq':
+                store.codebooks = data['codebooks']
+        store._size = len(store._codes)
+        return store
+    
+    def train(self, vectors: np.ndarray):
+        """Learn PQ codebooks if needed, then encode the whole catalog"""
+        dimension = vectors.shape[1]
+        if self.kind == 'pq':
+            self.num_subvectors = min(self.num_subvectors, dimension)
+            while dimension % self.num_subvectors:
+                self.num_subvectors -= 1
+            
+            rng = np.random.default_rng(self.seed)
+            sample = vectors
+            if len(vectors) > self.train_sample_size:
+                sample = vectors[np.sort(rng.choice(len(vectors), self.train_sample_size, replace=False))]
+            pieces = np.asarray(sample, dtype=np.float32).reshape(len(sample), self.num_subvectors, -1)
+            self.codebooks = np.stack([kmeans(pieces[:, j], PQ_CENTROIDS, self.train_iterations, self.seed + j)
+                                       for j in range(self.num_subvectors)])
+        
+        width, dtype = {'float16': (dimension, np.float16), 'int8': (dimension, np.int8),
+                        'pq': (self.num_subvectors, np.uint8)}[self.kind]
+        self._codes = np.empty((0, width), dtype=dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._size = 0
+        self.add(vectors)
+    
+    def add(self, vectors: np.ndarray):
+        """Compress and append normalized catalog rows"""
+        if not self.is_trained:
+            return
+        vectors = np.atleast_2d(vectors)
+        for offset in range(0, len(vectors), self.SCORE_CHUNK_ROWS):
+            codes, scales = self.encode(np.asarray(vectors[offset:offset + self.SCORE_CHUNK_ROWS], dtype=np.float32))
+            required = self._size + len(codes)
+            if required > len(self._codes):
+                capacity = max(required, 2 * len(self._codes))
+                self._codes = self._grow(self._codes, capacity)
+                if scales is not None:
+                    self._scales = self._grow(self._scales, capacity)
+            self._codes[self._size:required] = codes
+            if scales is not None:
+                self._scales[self._size:required] = scales
+            self._size = required
+    
+    def replace(self, row: int, vector: np.ndarray):
+        """Re-compress one updated catalog row"""
+        if not self.is_trained:
+            return
+        codes, scales = self.encode(np.atleast_2d(np.asarray(vector, dtype=np.float32)))
+        self._codes[row] = codes[0]
+        if scales is not None:
+            self._scales[row] = scales[0]
+    
+    def _grow(self, array: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+    
+    def encode(self, vectors: np.ndarray):
+        """Codes (and int8 scales) for a block of float32 rows"""
+        if self.kind == 'float16':
+            return vectors.astype(np.float16), None
+        if self.kind == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        
+        pieces = vectors.reshape(len(vectors), self.num_subvectors, -1)
+        codes = np.empty((len(vectors), self.num_subvectors), dtype=np.uint8)
+        for j in range(self.num_subvectors):
+            codes[:, j] = nearest_centroids(pieces[:, j], self.codebooks[j])
+        return codes, None
+    
+    def scores(self, query_embedding: np.ndarray, rows=None) -> np.ndarray:
+        """Approximate query similarities for the given rows (an array or slice; all rows when None)"""
+        codes = self._codes[:self._size]
+        scales = self._scales[:self._size]
+        if isinstance(rows, slice):
+            codes, scales = codes[rows], scales[rows]
+            rows = None
+        count = len(codes) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        if self.kind == 'pq':
+            table = np.einsum('jcs,js->jc', self.codebooks, query_embedding.reshape(self.num_subvectors, -1))
+            subspaces = np.arange(self.num_subvectors)
+        
+        for start in range(0, count, self.SCORE_CHUNK_ROWS):
+            chunk = slice(start, start + self.SCORE_CHUNK_ROWS)
+            block = codes[chunk] if rows is None else codes[rows[chunk]]
+            if self.kind == 'pq':
+                scores[chunk] = table[subspaces, block].sum(axis=1)
+            else:
+                scores[chunk] = block.astype(np.float32) @ query_embedding
+                if self.kind == 'int8':
+                    scores[chunk] *= scales[chunk] if rows is None else scales[rows[chunk]]
+        return scores
+
+class InteractionLog:
+    """
+    Append-only JSON-lines write-ahead log of preference events
+    
+    Each event is flushed as it is appended but fsync'd in batches (every
+    fsync_every events or fsync_interval seconds), so recording feedback
+    never waits on a full-state rewrite. The log is replayed on load and
+    truncated once its events are captured in a profile snapshot.
+    """
+    
+    def __init__(self, path: str, fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.entries = 0  # Events currently in the log file
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def append(self, event: Dict):
+        """Append one event, fsyncing when the current batch is due"""
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(event) + '\n')
+        self._file.flush()
+        self.entries += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+    
+    def sync(self):
+        """Force appended events to stable storage"""
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def replay(self):
+        """Yield logged events in order, skipping lines torn by a crash"""
+        self.entries = 0
+        try:
+            f = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries += 1
+                yield event
+    
+    def truncate(self):
+        """Drop all events once a snapshot contains them"""
+        self.close()
+        if os.path.exists(self.path):
+            open(self.path, 'w').close()
+        self.entries = 0
+    
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Terminate a line torn by a crash so new events start cleanly
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        else:
+            torn = False
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            self._file.write('\n')
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache with optional TTL
+    
+    Entries older than ttl_seconds are treated as misses; None disables
+    expiry. get() may also be given a `valid` check, e.g. that a cached
+    value's versions are current: invalid entries are dropped and counted
+    as misses, like expired ones. With max_bytes, `sizeof` estimates each value's memory and
+    least-recently-used entries are also evicted to stay within that
+    budget. Hit/miss counters are exposed through stats().
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = None, max_bytes: int = None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0  # Estimated size of the cached values (with sizeof)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value, size)
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key, default=None, valid=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and ((self.ttl_seconds is not None and time.monotonic() - entry[0] > self.ttl_seconds)
+                                      or (valid is not None and not valid(entry[1]))):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return  # Would evict everything else and still not fit
+            self._entries[key] = (time.monotonic(), value, size)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key):
+        self.nbytes -= self._entries.pop(key)[2]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+    
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        stats = {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+        if self.sizeof:
+            stats['bytes'] = self.nbytes
+        return stats
+
+class StageTimer:
+    """Context manager recording the duration of one stage into Metrics"""
+    
+    __slots__ = ('metrics', 'stage', 'start')
+    
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """
+    Per-stage latency histograms and counters for CineRAG-AI
+    
+    time(stage) wraps a block and records its duration in that stage's
+    histogram; increment() bumps a counter; gauges are callables read at
+    export time. Everything exports as a stats dict or as Prometheus text.
+    When disabled, time() returns a shared no-op context manager and
+    increment() returns at once, so the hooks cost next to nothing.
+    """
+    
+    def __init__(self, enabled: bool = False, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, List[int]] = {}  # Stage -> per-bucket counts, last is +Inf
+        self.sums: Dict[str, float] = {}  # Stage -> total seconds
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, object] = {}  # Name -> zero-argument callable
+        self._lock = threading.Lock()
+    
+    def time(self, stage: str):
+        return StageTimer(self, stage) if self.enabled else NULL_TIMER
+    
+    def observe(self, stage: str, seconds: float):
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self.histograms.get(stage)
+            if counts is None:
+                counts = self.histograms[stage] = [0] * (len(self.buckets) + 1)
+            counts[bucket] += 1
+            self.sums[stage] = self.sums.get(stage, 0.0) + seconds
+    
+    def increment(self, name: str, amount: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def register_gauge(self, name: str, read):
+        self.gauges[name] = read
+    
+    def stats(self) -> Dict:
+        """Snapshot of stage histograms (cumulative buckets), counters and gauges"""
+        with self._lock:
+            histograms = {stage: list(counts) for stage, counts in self.histograms.items()}
+            sums = dict(self.sums)
+            counters = dict(self.counters)
+        
+        stages = {}
+        for stage, counts in histograms.items():
+            count = sum(counts)
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            stages[stage] = {
+                'count': count,
+                'sum_seconds': sums[stage],
+                'mean_ms': sums[stage] / count * 1000,
+                'buckets': dict(zip(bounds, itertools.accumulate(counts)))
+            }
+        return {
+            'stages': stages,
+            'counters': counters,
+            'gauges': {name: read() for name, read in self.gauges.items()}
+        }
+    
+    def prometheus_text(self, prefix: str = 'cinerag') -> str:
+        """Stats in the Prometheus text exposition format"""
+        stats = self.stats()
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        for stage, histogram in stats['stages'].items():
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum_seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        for name, value in stats['counters'].items():
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        for name, value in stats['gauges'].items():
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache of catalog embeddings
+    
+    Keys are SHA-1 digests of the model identifier plus the exact embedded
+    text, so re-ingesting unchanged movies skips the encoder entirely.
+    Normalized vectors are appended to a raw float32 file that is read
+    back through a memmap, alongside a file of 20-byte keys in row order.
+    """
+    
+    KEY_BYTES = 20
+    
+    def __init__(self, directory: str, model_id: str):
+        self.model_id = model_id
+        self.directory = os.path.join(directory, hashlib.sha1(model_id.encode()).hexdigest()[:16])
+        self.keys_path = os.path.join(self.directory, 'keys.bin')
+        self.vectors_path = os.path.join(self.directory, 'vectors.f32')
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.hits = 0
+        self.misses = 0
+        self._rows = None  # Key -> row, loaded on first use
+        self._dimension = None
+        self._mapped = None
+    
+    def key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self.model_id}\0{text}".encode()).digest()
+    
+    def encode(self, texts: List[str], encoder) -> np.ndarray:
+        """Normalized embeddings for texts, calling encoder(texts) only for cache misses"""
+        self._load()
+        keys = [self.key(text) for text in texts]
+        
+        # Encode each distinct missing text once
+        missing = OrderedDict()
+        for key, text in zip(keys, texts):
+            if key not in self._rows:
+                missing.setdefault(key, text)
+        fresh_rows = {}
+        if missing:
+            fresh = normalize_embeddings(encoder(list(missing.values())))
+            fresh_rows = dict(zip(missing, fresh))
+            self._append(list(missing), fresh)
+        
+        hit_positions = [i for i, key in enumerate(keys) if key not in fresh_rows]
+        self.hits += len(hit_positions)
+        self.misses += len(texts) - len(hit_positions)
+        
+        result = np.empty((len(texts), self._dimension or 0), dtype=np.float32)
+        if hit_positions:
+            rows = np.array([self._rows[keys[i]] for i in hit_positions], dtype=np.int64)
+            result[hit_positions] = self._vectors(int(rows.max()) + 1)[rows]
+        for i, key in enumerate(keys):
+            if key in fresh_rows:
+                result[i] = fresh_rows[key]
+        return result
+    
+    def _load(self):
+        if self._rows is not None:
+            return
+        self._rows = {}
+        if not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path) as f:
+            self._dimension = json.load(f)['dimension']
+        
+        # Rows are complete only once both the vector and its key were written
+        with open(self.keys_path, 'rb') as f:
+            key_data = f.read()
+        count = min(len(key_data) // self.KEY_BYTES,
+                    os.path.getsize(self.vectors_path) // (4 * self._dimension))
+        for row in range(count):
+            self._rows[key_data[row * self.KEY_BYTES:(row + 1) * self.KEY_BYTES]] = row
+        self._truncate(count)
+    
+    def _append(self, keys: List[bytes], vectors: np.ndarray):
+        if self._dimension is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._dimension = vectors.shape[1]
+            with open(self.meta_path, 'w') as f:
+                json.dump({'model_id': self.model_id, 'dimension': self._dimension}, f)
+        
+        start_row = len(self._rows)
+        with open(self.vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.keys_path, 'ab') as f:
+            f.write(b''.join(keys))
+        for row, key in enumerate(keys, start_row):
+            self._rows[key] = row
+    
+    def _truncate(self, count: int):
+        """Drop a partial trailing record left by an interrupted append"""
+        for path, record_bytes in ((self.keys_path, self.KEY_BYTES), (self.vectors_path, 4 * self._dimension)):
+            if os.path.getsize(path) != count * record_bytes:
+                with open(path, 'r+b') as f:
+                    f.truncate(count * record_bytes)
+    
+    def _vectors(self, min_rows: int) -> np.ndarray:
+        """Memmap of the vector file, remapped when it has grown past the mapped rows"""
+        if self._mapped is None or len(self._mapped) < min_rows:
+            self._mapped = np.memmap(self.vectors_path, dtype=np.float32, mode='r').reshape(-1, self._dimension)
+        return self._mapped
+
+class UserProfile:
+    """
+    Compact per-user preference profile
+    
+    Likes and dislikes are sets of integer movie IDs (catalog rows) and
+    only the most recent interactions are kept; the full history lives in
+    the interaction log. The taste vector is a running sum of liked
+    embeddings (plus an optional time-decayed sum), updated in O(d) per
+    like. A typical profile takes a few kilobytes.
+    """
+    
+    __slots__ = ('user_id', 'liked', 'disliked', 'preferred_genres', 'recent_history',
+                 'interaction_count', 'event_seq', 'taste_sum', 'taste_count',
+                 'decayed_taste', 'taste_updated_at', 'taste_encoder')
+    
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.liked = set()
+        self.disliked = set()
+        self.preferred_genres: List[str] = []
+        self.recent_history = deque(maxlen=PROFILE_HISTORY_LENGTH)  # (movie_id, action)
+        self.interaction_count = 0
+        self.event_seq = 0  # Last interaction-log event applied to this profile
+        self.taste_sum = None  # Sum of liked embeddings
+        self.taste_count = 0
+        self.decayed_taste = None  # Exponentially time-decayed sum of liked embeddings
+        self.taste_updated_at = 0.0  # Epoch seconds of the last decayed update
+        self.taste_encoder = None  # Encoder identity of the taste sums; None for older profiles
+    
+    def add_liked_embedding(self, embedding: np.ndarray, timestamp: float, half_life: float = None):
+        """O(d) update of the running taste sum and, with a half-life in seconds, the decayed sum"""
+        if self.taste_sum is None:
+            self.taste_sum = np.zeros(len(embedding), dtype=np.float32)
+        self.taste_sum += embedding
+        self.taste_count += 1
+        
+        if half_life:
+            if self.decayed_taste is None:
+                self.decayed_taste = np.zeros(len(embedding), dtype=np.float32)
+            elapsed = max(0.0, timestamp - self.taste_updated_at)
+            self.decayed_taste *= 0.5 ** (elapsed / half_life)
+            self.decayed_taste += embedding
+            self.taste_updated_at = max(timestamp, self.taste_updated_at)
+    
+    def taste_vector(self, decayed: bool = False) -> np.ndarray:
+        """Unit-length taste centroid (None before the first like)"""
+        vector = self.decayed_taste if decayed and self.decayed_taste is not None else self.taste_sum
+        if vector is None or not self.taste_count:
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def reset_taste(self):
+        """Drop the taste sums, e.g. when they were built from another encoder's embeddings"""
+        self.taste_sum = None
+        self.taste_count = 0
+        self.decayed_taste = None
+        self.taste_updated_at = 0.0
+    
+    def to_dict(self) -> Dict:
+        return {
+            'user_id': self.user_id,
+            'liked': sorted(self.liked),
+            'disliked': sorted(self.disliked),
+            'preferred_genres': self.preferred_genres,
+            'recent_history': list(self.recent_history),
+            'interaction_count': self.interaction_count,
+            'event_seq': self.event_seq,
+            'taste_sum': encode_vector(self.taste_sum) if self.taste_sum is not None else None,
+            'taste_count': self.taste_count,
+            'decayed_taste': encode_vector(self.decayed_taste) if self.decayed_taste is not None else None,
+            'taste_updated_at': self.taste_updated_at,
+            'taste_encoder': self.taste_encoder
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserProfile':
+        profile = cls(data['user_id'])
+        profile.liked = set(data['liked'])
+        profile.disliked = set(data['disliked'])
+        profile.preferred_genres = data['preferred_genres']
+        profile.recent_history.extend(tuple(item) for item in data['recent_history'])
+        profile.interaction_count = data['interaction_count']
+        profile.event_seq = data['event_seq']
+        if data.get('taste_sum'):
+            profile.taste_sum = decode_vector(data['taste_sum'])
+            profile.taste_count = data['taste_count']
+        if data.get('decayed_taste'):
+            profile.decayed_taste = decode_vector(data['decayed_taste'])
+            profile.taste_updated_at = data['taste_updated_at']
+        profile.taste_encoder = data.get('taste_encoder')
+        return profile
+
+class ProfileStore:
+    """
+    Sharded on-disk store of user profiles with an LRU of hot profiles
+    
+    Each profile is a small JSON file in one of 256 shard directories
+    picked by a hash of the user ID, read only when that user is first
+    needed. Modified profiles are written back when they fall out of the
+    LRU or on flush().
+    """
+    
+    def __init__(self, directory: str, cache_size: int = 10000):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._profiles = OrderedDict()  # user_id -> UserProfile, least recent first
+        self._dirty = set()
+        self._lock = threading.RLock()
+    
+    def __len__(self):
+        """Profiles currently held in memory"""
+        return len(self._profiles)
+    
+    def path_for(self, user_id: str) -> str:
+        digest = hashlib.sha1(user_id.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest[2:22]}.json")
+    
+    def get(self, user_id: str) -> UserProfile:
+        """The user's profile, loaded from disk or created on first use"""
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                self._profiles.move_to_end(user_id)
+                return profile
+            
+            try:
+                with open(self.path_for(user_id)) as f:
+                    profile = UserProfile.from_dict(json.load(f))
+            except FileNotFoundError:
+                profile = UserProfile(user_id)
+            self._profiles[user_id] = profile
+            self._evict()
+            return profile
+    
+    def mark_dirty(self, profile: UserProfile):
+        with self._lock:
+            self._dirty.add(profile.user_id)
+    
+    def flush(self):
+        """Write every modified cached profile to disk"""
+        with self._lock:
+            for user_id in list(self._dirty):
+                self._write(self._profiles[user_id])
+            self._dirty.clear()
+    
+    def _evict(self):
+        while len(self._profiles) > self.cache_size:
+            user_id, profile = self._profiles.popitem(last=False)
+            if user_id in self._dirty:
+                self._write(profile)
+                self._dirty.discard(user_id)
+    
+    def _write(self, profile: UserProfile):
+        path = self.path_for(profile.user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file_atomically(path, lambda f: json.dump(profile.to_dict(), f), mode='w')
 
 class CineRAGAI:
     """
@@ -44,31 +1861,97 @@ class CineRAGAI:
     5. Adaptive user preference modeling
     """
     
-    def __init__(self):
+    def __init__(self, query_cache_size: int = 1024, query_cache_ttl: float = 3600.0,
+                 preload_model: bool = False, profile_cache_size: int = 10000,
+                 taste_half_life_days: float = None, recommendation_cache_size: int = 10000,
+                 search_workers: int = 1, ai_model=None, metrics: bool = False,
+                 encoder_backend: str = 'sentence-transformers', encoder_options: Dict = None,
+                 result_cache_size: int = 10000, result_cache_mb: float = 64.0, reencode: bool = False,
+                 seed_catalog: bool = True):
         print("🎬 Initializing CineRAG-AI...")
-        print("🤖 Loading advanced AI models... (this may take a moment)")
         
-        # Initialize the AI brain for semantic understanding
-        self.ai_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # The AI brain for semantic understanding: an encoder backend picked by
+        # name (see ENCODER_BACKENDS), or a ready-made encoder (anything with
+        # SentenceTransformer's encode()). Models load on first encode, or are
+        # warmed in the background while saved data loads.
+        self.ai_model = ai_model if ai_model is not None else create_encoder(encoder_backend, **(encoder_options or {}))
+        if preload_model:
+            self.warm_up_model()
         
         # Core data storage
-        self.movies: List[Movie] = []
-        self.movie_embeddings = []  # Vector representations for AI
-        self.user_preferences = {
-            'liked_movies': [],
-            'disliked_movies': [],
-            'preferred_genres': [],
-            'interaction_history': []
-        }
+        self.movies = MovieCatalog()  # Column-oriented; a movie's ID is its row
+        self.movie_embeddings = EmbeddingMatrix()  # Normalized vector representations for AI
+        self.catalog_dirty = False  # Catalog changed since last save
+        self.catalog_version = 0  # Bumped whenever movies are added
+        
+        # Per-user profiles, loaded on demand; preference events are appended
+        # to a log that is compacted by flushing the profiles
+        self.profiles = ProfileStore(PROFILES_DIR, cache_size=profile_cache_size)
+        self.interaction_log = InteractionLog(INTERACTION_LOG_FILE)
+        self.event_seq = 0  # Sequence number of the last logged event
+        # With a half-life, recent likes outweigh old ones in the taste vector
+        self.taste_half_life = taste_half_life_days * 86400 if taste_half_life_days else None
+        
+        # Repeated queries skip the encoder
+        self.query_cache = LRUCache(max_entries=query_cache_size, ttl_seconds=query_cache_ttl)
+        # Recommendations per user, valid until their profile or the catalog changes
+        self.recommendation_cache = LRUCache(max_entries=recommendation_cache_size)
+        # Ranked search results, valid until the searcher's profile or the catalog changes
+        self.result_cache = LRUCache(max_entries=result_cache_size, max_bytes=int(result_cache_mb * 2**20),
+                                     sizeof=results_nbytes)
+        # Unchanged movies skip the encoder on re-ingestion
+        self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, self.encoder_identity)
+        
+        # Lookup structures kept in sync with the catalog; a movie's ID is its row
+        self.title_index = TitleIndex(self.movies.titles)  # Normalized title -> movie ID, plus fuzzy matching
+        self.metadata = MetadataIndex(self.movies)  # Vectorized genre/year/rating filters
+        self.lexical_index = LexicalIndex()  # BM25 postings and normalized titles
+        
+        # Optional approximate index; None means exact brute-force search
+        self.ann_index = None
+        # Stage timings and counters; hooks are no-ops unless enabled
+        self.metrics = Metrics(enabled=metrics)
+        self.metrics.register_gauge('catalog_movies', lambda: len(self.movies))
+        self.metrics.register_gauge('cached_profiles', lambda: len(self.profiles))
+        for name, cache in (('query_cache', self.query_cache), ('recommendation_cache', self.recommendation_cache),
+                            ('result_cache', self.result_cache)):
+            self.metrics.register_gauge(f'{name}_hits', lambda cache=cache: cache.hits)
+            self.metrics.register_gauge(f'{name}_misses', lambda cache=cache: cache.misses)
+        
+        # Optional compressed embeddings scored instead of the float32 rows
+        self.quantized = None
+        # With several workers, large scans are split into shards scored in parallel
+        self.search_workers = max(1, search_workers)
+        self.search_pool = None
+        if self.search_workers > 1:
+            self.search_pool = ThreadPoolExecutor(max_workers=self.search_workers, thread_name_prefix='cinerag-search')
         
         print("✅ CineRAG-AI is ready for intelligent movie discovery!")
         
-        # Load existing data or initialize with samples
-        self.load_system_data()
+        # Load existing data or initialize with samples (unless starting empty was asked for)
+        self.load_system_data(reencode)
         
-        if not self.movies:
+        if not self.movies and seed_catalog:
             self.initialize_movie_database()
     
+    @property
+    def encoder_identity(self) -> str:
+        """Identifies the embedding space; recorded with the catalog and taste vectors"""
+        return encoder_identity(self.ai_model)
+    
+    def warm_up_model(self) -> threading.Thread:
+        """Load the AI model in a background thread so the first search does not wait"""
+        def load():
+            try:
+                if hasattr(self.ai_model, 'load'):
+                    self.ai_model.load()
+            except Exception as e:
+                print(f"⚠️ CineRAG-AI model warm-up failed: {e}")
+        
+        thread = threading.Thread(target=load, name='cinerag-model-warmup', daemon=True)
+        thread.start()
+        return thread
+    
     def initialize_movie_database(self):
         """Initialize CineRAG-AI with curated movie database"""
         print("🎬 Initializing CineRAG-AI movie database...")
@@ -120,34 +2003,374 @@ class CineRAGAI:
                   "Dr. Lily Houghton enlists the aid of wisecracking skipper Frank Wolff to take her down the Amazon in his ramshackle boat to find an ancient tree.")
         ]
         
-        for movie in premium_movies:
-            self.add_movie_to_system(movie)
+        self.add_movies(premium_movies)
         
         print(f"✅ CineRAG-AI database initialized with {len(premium_movies)} premium movies!")
     
     def add_movie_to_system(self, movie: Movie):
-        """Add a movie to CineRAG-AI with AI processing"""
-        # Create comprehensive content for AI understanding
-        movie_content = f"{movie.title} {movie.genre} {movie.description}"
+        """Add a movie to CineRAG-AI with AI processing, or update it if the title is known"""
+        known = self.title_index.movie_id(movie.title) is not None
+        self.add_movie_batch([movie])
+        
+        print(f"🎬 {'Updated in' if known else 'Added to'} CineRAG-AI: {movie.title}")
+    
+    def add_movies(self, movies, batch_size: int = 256, save: bool = True) -> int:
+        """
+        Bulk-add movies to CineRAG-AI
+        
+        Movies are encoded batch_size at a time and each batch of embeddings
+        is appended to the matrix in one step. Progress is reported per
+        batch and system data is saved once at the end.
+        """
+        added = 0
+        batch = []
+        for movie in movies:
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                added += self.add_movie_batch(batch)
+                batch = []
+                print(f"🎬 CineRAG-AI ingested {added} movies...")
+        if batch:
+            added += self.add_movie_batch(batch)
+        
+        print(f"🎬 Added {added} movies to CineRAG-AI")
+        if save and added:
+            self.save_system_data()
+        return added
+    
+    def add_movie_batch(self, batch: List[Movie]) -> int:
+        """
+        Encode a batch of movies in one model call and store them
+        
+        A movie whose title is already in the catalog (up to case and
+        punctuation) is updated in place and keeps its movie ID; only
+        movies whose embedded text changed are re-encoded. Returns the
+        number of movies added or updated.
+        """
+        if not batch:
+            return 0
+        
+        # Split off updates; of duplicates within the batch, the last wins
+        new_movies: Dict[str, Movie] = {}
+        updates: Dict[int, Movie] = {}
+        for movie in batch:
+            movie_id = self.title_index.movie_id(movie.title)
+            if movie_id is None:
+                new_movies[normalize_title(movie.title)] = movie
+            else:
+                updates[movie_id] = movie
+        new_movies = list(new_movies.values())
+        reencoded = [movie_id for movie_id, movie in updates.items()
+                     if movie.embedding_text() != self.movies[movie_id].embedding_text()]
         
-        # Generate AI embedding (vector representation)
-        movie_embedding = self.ai_model.encode(movie_content)
+        # Generate AI embeddings (vector representations), reusing cached ones
+        with self.metrics.time('ingest_encode'):
+            embeddings = self.embedding_cache.encode(
+                [movie.embedding_text() for movie in new_movies + [updates[movie_id] for movie_id in reencoded]],
+                lambda texts: self.ai_model.encode(texts, batch_size=len(texts))
+            )
         
         # Store in system
-        self.movies.append(movie)
-        self.movie_embeddings.append(movie_embedding)
+        if new_movies:
+            start_row = len(self.movies)
+            self.movies.extend(new_movies)
+            self.movie_embeddings.append(embeddings[:len(new_movies)])
+            for row, movie in enumerate(new_movies, start_row):
+                self.index_movie(row, movie)
+            # Indexes enabled on an empty catalog are trained on its first batch
+            if self.ann_index is not None:
+                if self.ann_index.is_trained:
+                    self.ann_index.add(self.movie_embeddings[start_row:], start_row)
+                else:
+                    self.ann_index.train(self.movie_embeddings.vectors)
+            if self.quantized is not None:
+                if self.quantized.is_trained:
+                    self.quantized.add(self.movie_embeddings[start_row:])
+                else:
+                    self.quantized.train(self.movie_embeddings.vectors)
+        
+        new_embeddings = dict(zip(reencoded, embeddings[len(new_movies):]))
+        for movie_id, movie in updates.items():
+            self.update_movie(movie_id, movie, new_embeddings.get(movie_id))
+        self.catalog_dirty = True
+        self.catalog_version += 1
+        
+        return len(new_movies) + len(updates)
+    
+    def update_movie(self, movie_id: int, movie: Movie, embedding: np.ndarray = None):
+        """Overwrite a catalog entry in place; with a new embedding, also re-index it for search"""
+        old_movie = self.movies[movie_id]
+        self.movies[movie_id] = movie
+        if embedding is None:
+            return
+        
+        old_vector = self.movie_embeddings[movie_id].copy()
+        self.movie_embeddings.replace(movie_id, embedding)
+        vector = self.movie_embeddings[movie_id]
+        self.lexical_index.replace(movie_id, old_movie, movie)
+        if self.ann_index is not None:
+            self.ann_index.replace(movie_id, old_vector, vector)
+        if self.quantized is not None:
+            self.quantized.replace(movie_id, vector)
+    
+    def index_movie(self, row: int, movie: Movie):
+        """Register a catalog row in the title, metadata and keyword lookups"""
+        self.title_index.add(row, movie.title)
+        self.lexical_index.add(row, movie)
+    
+    def rebuild_indexes(self, lexical_index: LexicalIndex = None, title_index: TitleIndex = None):
+        """Rebuild catalog lookups after loading, reusing saved title keys and BM25 postings that cover the catalog"""
+        self.metadata = MetadataIndex(self.movies)
+        if title_index is None:
+            title_index = TitleIndex(self.movies.titles)
+            for row in range(len(self.movies)):
+                title_index.add(row, self.movies.titles[row])
+        self.title_index = title_index
+        if lexical_index is None or len(lexical_index) != len(self.movies):
+            lexical_index = LexicalIndex()
+            for row, movie in enumerate(self.movies):
+                lexical_index.add(row, movie)
+        self.lexical_index = lexical_index
+    
+    def reencode_catalog(self, batch_size: int = 1024):
+        """
+        Re-embed the whole catalog with the current encoder
+        
+        Needed when saved embeddings came from another backend or model:
+        scores between vectors from different encoders are meaningless.
+        ANN and quantized indexes are retrained on the new vectors, and
+        profile taste vectors are rebuilt from likes as profiles are used.
+        """
+        print(f"🔄 CineRAG-AI re-encoding {len(self.movies):,} movies with {self.encoder_identity}...")
+        embeddings = EmbeddingMatrix()
+        for start in range(0, len(self.movies), batch_size):
+            with self.metrics.time('ingest_encode'):
+                embeddings.append(self.embedding_cache.encode(
+                    [movie.embedding_text() for movie in self.movies[start:start + batch_size]],
+                    lambda texts: self.ai_model.encode(texts, batch_size=len(texts))
+                ))
+        self.movie_embeddings = embeddings
+        
+        if self.ann_index is not None and self.ann_index.is_trained:
+            self.ann_index.train(self.movie_embeddings.vectors)
+        if self.quantized is not None and self.quantized.is_trained:
+            self.quantized.train(self.movie_embeddings.vectors)
+        self.query_cache.clear()
+        self.recommendation_cache.clear()
+        self.result_cache.clear()
+        self.catalog_dirty = True
+        self.catalog_version += 1
+    
+    def rows_for_titles(self, titles) -> np.ndarray:
+        """Catalog rows for the given titles, skipping unknown ones"""
+        rows = [self.title_index.lookup(title) for title in titles]
+        return np.array([row for row in rows if row is not None], dtype=np.int64)
+    
+    def genre_mask(self, genres, rows=slice(None)) -> np.ndarray:
+        """Boolean mask over the catalog (or just the given rows) of movies in any of the genres"""
+        return self.metadata.genre_mask(genres, rows)
+    
+    def enable_ann_index(self, num_lists: int = 0, nprobe: int = 8):
+        """Switch search to an IVF approximate index trained on the catalog"""
+        self.ann_index = IVFIndex(num_lists=num_lists, nprobe=nprobe)
+        if len(self.movie_embeddings):
+            self.ann_index.train(self.movie_embeddings.vectors)
+        self.catalog_dirty = True
+        self.result_cache.clear()  # Rankings may change with approximate search
+        print(f"⚡ CineRAG-AI ANN index ready ({len(self.ann_index.lists)} lists, nprobe={nprobe})")
+    
+    def measure_ann_recall(self, k: int = 10, nprobe: int = None, num_queries: int = 100) -> Dict[str, float]:
+        """
+        Compare the ANN index against the exact scorer
+        
+        Uses catalog embeddings as probe queries and reports recall@k plus
+        mean/p99 latency (ms) of both paths, for tuning nprobe.
+        """
+        if self.ann_index is None or not self.ann_index.is_trained:
+            raise ValueError("ANN index is not enabled or not trained")
+        
+        vectors = self.movie_embeddings.vectors
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+        
+        hits = 0
+        exact_times, ann_times = [], []
+        for query_embedding in queries:
+            start = time.perf_counter()
+            exact = top_k_indices(vectors @ query_embedding, k)
+            exact_times.append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            rows = self.ann_index.candidates(query_embedding, nprobe)
+            approximate = rows[top_k_indices(vectors[rows] @ query_embedding, k)]
+            ann_times.append(time.perf_counter() - start)
+            
+            hits += len(np.intersect1d(exact, approximate))
+        
+        return {
+            f'recall@{k}': hits / (len(queries) * min(k, len(vectors))),
+            'exact_mean_ms': float(np.mean(exact_times) * 1000),
+            'exact_p99_ms': float(np.percentile(exact_times, 99) * 1000),
+            'ann_mean_ms': float(np.mean(ann_times) * 1000),
+            'ann_p99_ms': float(np.percentile(ann_times, 99) * 1000),
+        }
+    
+    def enable_quantization(self, kind: str = 'int8', rescore_depth: int = 100, num_subvectors: int = 48):
+        """
+        Score from compressed embeddings ('float16', 'int8' or 'pq')
+        
+        The float32 embeddings stay on disk (memory-mapped) and are only
+        read to re-score the top rescore_depth candidates exactly; pass 0
+        to rank on the approximate scores alone.
+        """
+        self.quantized = QuantizedEmbeddings(kind, rescore_depth, num_subvectors)
+        if len(self.movie_embeddings):
+            self.quantized.train(self.movie_embeddings.vectors)
+        self.catalog_dirty = True
+        self.result_cache.clear()  # Rankings may change with the compressed scores
+        print(f"🗜️ CineRAG-AI {kind} embeddings ready ({self.quantized.nbytes / 2**20:.1f} MB)")
+    
+    def measure_quantization(self, k: int = 10, num_queries: int = 100) -> Dict[str, float]:
+        """
+        Report memory saved against recall lost by the quantized embeddings
+        
+        Uses catalog embeddings as probe queries; recall@k is measured for
+        the approximate ranking and after exact re-scoring of its top
+        rescore_depth rows.
+        """
+        if self.quantized is None or not self.quantized.is_trained:
+            raise ValueError("Quantization is not enabled or not trained")
+        
+        vectors = self.movie_embeddings.vectors
+        rng = np.random.default_rng(0)
+        queries = vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+        depth = max(k, self.quantized.rescore_depth)
+        
+        hits = rescored_hits = 0
+        times = []
+        for query_embedding in queries:
+            exact = top_k_indices(vectors @ query_embedding, k)
+            
+            start = time.perf_counter()
+            shortlist = top_k_indices(self.quantized.scores(query_embedding), depth)
+            times.append(time.perf_counter() - start)
+            rescored = shortlist[top_k_indices(vectors[shortlist] @ query_embedding, k)]
+            
+            hits += len(np.intersect1d(exact, shortlist[:k]))
+            rescored_hits += len(np.intersect1d(exact, rescored))
+        
+        float32_bytes = vectors.shape[0] * vectors.shape[1] * 4
+        total = len(queries) * min(k, len(vectors))
+        return {
+            'float32_mb': float32_bytes / 2**20,
+            'quantized_mb': self.quantized.nbytes / 2**20,
+            'compression': float32_bytes / max(self.quantized.nbytes, 1),
+            f'recall@{k}': hits / total,
+            f'rescored_recall@{k}': rescored_hits / total,
+            'mean_ms': float(np.mean(times) * 1000),
+        }
+    
+    def similarity_scores(self, vector: np.ndarray, rows=None, exact: bool = False) -> np.ndarray:
+        """Similarity of catalog rows (array, slice or all when None) to a unit vector, from quantized codes when enabled"""
+        if self.quantized is not None and self.quantized.is_trained and not exact:
+            return self.quantized.scores(vector, rows)
+        vectors = self.movie_embeddings.vectors
+        return (vectors if rows is None else vectors[rows]) @ vector
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """Normalized query embedding, served from the LRU cache when possible"""
+        key = normalize_query(query)
+        query_embedding = self.query_cache.get(key)
+        if query_embedding is None:
+            with self.metrics.time('encode'):
+                query_embedding = normalize_embeddings(self.ai_model.encode(key))[0]
+            self.query_cache.put(key, query_embedding)
+        return query_embedding
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Normalized embeddings for many queries, encoding all cache misses in one batch"""
+        keys = [normalize_query(query) for query in queries]
+        cached = [self.query_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, embedding in zip(keys, cached) if embedding is None))
         
-        print(f"🎬 Added to CineRAG-AI: {movie.title}")
+        fresh = {}
+        if missing:
+            with self.metrics.time('encode'):
+                embeddings = normalize_embeddings(self.ai_model.encode(missing, batch_size=len(missing)))
+            for key, embedding in zip(missing, embeddings):
+                self.query_cache.put(key, embedding)
+                fresh[key] = embedding
+        
+        return np.array([embedding if embedding is not None else fresh[key]
+                         for key, embedding in zip(keys, cached)], dtype=np.float32)
     
-    def intelligent_movie_search(self, query: str, num_results: int = 5) -> List[tuple]:
+    def search_many(self, queries: List[str], num_results: int = 5, user_id: str = DEFAULT_USER,
+                    filters: SearchFilters = None, hybrid: bool = True) -> List[List[tuple]]:
+        """
+        Batch version of intelligent_movie_search for offline jobs
+        
+        Encodes all queries in one batch and scores them with query x catalog
+        matrix products, chunked so at most SCORE_CHUNK_ELEMENTS scores are
+        held at once. Personalization is applied to each chunk in bulk.
+        Always scans the (filtered) catalog exactly, even when an ANN index
+        is on. Title queries take the same encoder-free path as single
+        searches.
+        """
+        if not self.movies or not queries:
+            return [[] for _ in queries]
+        
+        results = [None] * len(queries)
+        if hybrid:
+            results = [self.search_by_title(query, num_results, user_id, filters) for query in queries]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        
+        allowed = self.metadata.filter_mask(filters)
+        candidates = None if allowed is None else np.flatnonzero(allowed)
+        vectors = self.movie_embeddings.vectors if candidates is None else self.movie_embeddings.vectors[candidates]
+        if not len(vectors):
+            return [[] for _ in queries]
+        
+        query_embeddings = self.encode_queries([queries[i] for i in pending])
+        profile = self.profiles.get(user_id)
+        chunk_size = max(1, SCORE_CHUNK_ELEMENTS // len(vectors))
+        depth = max(num_results, RRF_DEPTH) if hybrid else num_results
+        
+        self.metrics.increment('queries', len(pending))
+        for start in range(0, len(query_embeddings), chunk_size):
+            with self.metrics.time('similarity'):
+                similarities = query_embeddings[start:start + chunk_size] @ vectors.T
+            with self.metrics.time('personalization'):
+                similarities = self.apply_ai_personalization(similarities, candidates, profile)
+            with self.metrics.time('ranking'):
+                best = top_k_rows(similarities, depth)
+            for offset, (scores, columns) in enumerate(zip(similarities, best)):
+                rows = columns if candidates is None else candidates[columns]
+                index = pending[start + offset]
+                if hybrid:
+                    rows, scores = self.fuse_lexical(queries[index], rows, query_embeddings[start + offset],
+                                                     profile, allowed, num_results)
+                else:
+                    scores = scores[columns]
+                results[index] = self.results_for_rows(rows, scores)
+        return results
+    
+    def intelligent_movie_search(self, query: str, num_results: int = 5, user_id: str = DEFAULT_USER,
+                                 filters: SearchFilters = None, hybrid: bool = True) -> List[tuple]:
         """
         🧠 CineRAG-AI Core Search Engine
         
         Advanced AI-powered search using:
         1. Semantic understanding via sentence transformers
-        2. Vector similarity matching
+        2. Vector similarity matching (after optional metadata filters)
         3. User preference integration
-        4. Relevance scoring and ranking
+        4. Relevance scoring and ranking, fused with BM25 keyword matches
+        
+        Queries that name a movie are answered from the title index without
+        running the encoder. hybrid=False gives the purely semantic ranking.
+        Repeated searches are served from the result cache until the
+        catalog or the user's profile changes.
         """
         if not self.movies:
             print("❌ CineRAG-AI database is empty!")
@@ -155,175 +2378,556 @@ class CineRAGAI:
         
         print(f"🔍 CineRAG-AI analyzing: '{query}'")
         
-        # Step 1: Convert query to AI understanding
-        query_embedding = self.ai_model.encode(query)
-        
-        # Step 2: Calculate semantic similarities
-        movie_similarities = []
-        for i, movie_embedding in enumerate(self.movie_embeddings):
-            # Cosine similarity for semantic matching
-            similarity = np.dot(query_embedding, movie_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(movie_embedding)
-            )
-            movie_similarities.append((self.movies[i], similarity))
+        steps = self.lookup_or_search(query, num_results, user_id, filters, hybrid)
+        try:
+            # Step 1: Convert query to AI understanding (only if the caches cannot answer)
+            steps.send(self.encode_query(next(steps)))
+        except StopIteration as finished:
+            return finished.value
+    
+    def lookup_or_search(self, query: str, num_results: int = 5, user_id: str = DEFAULT_USER,
+                         filters: SearchFilters = None, hybrid: bool = True):
+        """
+        The cached search flow shared by intelligent_movie_search and the HTTP server
         
-        # Step 3: Apply AI-driven personalization
-        personalized_results = self.apply_ai_personalization(movie_similarities)
+        A generator: it answers from the result cache, then the title fast
+        path, and only when both miss yields the query text and expects the
+        query embedding to be sent back. Its return value is the results, which
+        are cached. Synchronous callers encode in place; the server awaits its
+        micro-batched encoder.
+        """
+        key = self.result_cache_key(query, num_results, user_id, filters, hybrid)
+        results = self.cached_results(key)
+        if results is not None:
+            return results
+        versions = self.result_versions(user_id)
         
-        # Step 4: Rank and return top results
-        final_results = sorted(personalized_results, key=lambda x: x[1], reverse=True)
+        if hybrid:
+            results = self.search_by_title(query, num_results, user_id, filters)
+        if results is None:
+            query_embedding = yield query
+            results = self.search_by_embedding(query_embedding, num_results, user_id, filters,
+                                               lexical_query=query if hybrid else None)
         
-        return final_results[:num_results]
+        self.result_cache.put(key, (versions, results))
+        return list(results)
     
-    def apply_ai_personalization(self, movie_similarities: List[tuple]) -> List[tuple]:
-        """Apply CineRAG-AI personalization algorithms"""
-        if not self.user_preferences['liked_movies']:
-            return movie_similarities
+    def result_cache_key(self, query: str, num_results: int, user_id: str, filters: SearchFilters = None,
+                         hybrid: bool = True) -> tuple:
+        filters_key = None if filters is None or filters.is_empty() else filters.cache_key()
+        return (normalize_query(query), num_results, user_id, filters_key, hybrid)
+    
+    def result_versions(self, user_id: str) -> tuple:
+        """What a user's search results depend on: the catalog and their profile (its last applied event)"""
+        return (self.catalog_version, self.profiles.get(user_id).event_seq)
+    
+    def cached_results(self, key: tuple) -> List[tuple]:
+        """Cached results for a result_cache_key(), or None if missing or stale"""
+        versions = self.result_versions(key[2])
+        cached = self.result_cache.get(key, valid=lambda entry: entry[0] == versions)
+        if cached is None:
+            return None
+        self.metrics.increment('queries')
+        return list(cached[1])
+    
+    def search_by_title(self, query: str, num_results: int = 5, user_id: str = DEFAULT_USER,
+                        filters: SearchFilters = None) -> List[tuple]:
+        """
+        Encoder-free answer for exact and near-exact title queries
         
-        # Calculate user preference vector
-        liked_embeddings = []
-        for movie in self.movies:
-            if movie.title in self.user_preferences['liked_movies']:
-                idx = self.movies.index(movie)
-                liked_embeddings.append(self.movie_embeddings[idx])
+        Returns None unless the query names a movie that passes the filters.
+        The matching movies come first, followed by the movies closest to
+        the first match's stored embedding, ranked as in search_by_embedding.
+        """
+        movie_id = self.title_index.lookup(query)
+        rows = [] if movie_id is None else [movie_id]
+        allowed = self.metadata.filter_mask(filters)
+        if allowed is not None:
+            rows = [row for row in rows if allowed[row]]
+        if not rows:
+            return None
+        self.metrics.increment('queries')
+        self.metrics.increment('title_fast_path')
+        
+        similar_rows, similar_scores = self.rank_by_embedding(self.movie_embeddings[rows[0]], num_results + len(rows),
+                                                              user_id, filters, lexical_query=query)
+        keep = ~np.isin(similar_rows, rows)
+        results = self.results_for_rows(rows, np.ones(len(rows)))
+        results += self.results_for_rows(similar_rows[keep], similar_scores[keep])
+        return results[:num_results]
+    
+    def search_by_embedding(self, query_embedding: np.ndarray, num_results: int = 5, user_id: str = DEFAULT_USER,
+                            filters: SearchFilters = None, lexical_query: str = None) -> List[tuple]:
+        """Steps 2-4 of intelligent_movie_search for an already-encoded query"""
+        self.metrics.increment('queries')
+        rows, scores = self.rank_by_embedding(query_embedding, num_results, user_id, filters, lexical_query)
+        return self.results_for_rows(rows, scores)
+    
+    def rank_by_embedding(self, query_embedding: np.ndarray, num_results: int = 5, user_id: str = DEFAULT_USER,
+                          filters: SearchFilters = None, lexical_query: str = None):
+        """Best catalog rows and their scores for an encoded query, optionally fused with keyword matches"""
+        if not self.movies:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
         
-        if not liked_embeddings:
-            return movie_similarities
+        # Step 2: Cosine similarity in one product, over the whole catalog or
+        # only the candidate rows. Metadata filters are applied first, so a
+        # selective filter cuts the scoring work; the ANN shortlist is
+        # filtered too, falling back to the exact filtered scan if too few
+        # of its rows pass.
+        allowed = self.metadata.filter_mask(filters)
+        candidates = None
+        if self.ann_index is not None and self.ann_index.is_trained:
+            candidates = self.ann_index.candidates(query_embedding)
+            if allowed is not None:
+                candidates = candidates[allowed[candidates]]
+                if len(candidates) < num_results:
+                    candidates = np.flatnonzero(allowed)
+        elif allowed is not None:
+            candidates = np.flatnonzero(allowed)
         
-        # Create user taste profile
-        user_taste_vector = np.mean(liked_embeddings, axis=0)
+        profile = self.profiles.get(user_id)
+        depth = num_results if lexical_query is None else max(num_results, RRF_DEPTH)
+        rescore = self.quantized is not None and self.quantized.is_trained and self.quantized.rescore_depth
+        shortlist_size = max(depth, self.quantized.rescore_depth) if rescore else depth
         
-        # Enhance recommendations with personalization
-        enhanced_results = []
-        for movie, base_similarity in movie_similarities:
-            idx = self.movies.index(movie)
-            movie_embedding = self.movie_embeddings[idx]
-            
-            # Calculate taste alignment
-            taste_similarity = np.dot(user_taste_vector, movie_embedding) / (
-                np.linalg.norm(user_taste_vector) * np.linalg.norm(movie_embedding)
-            )
-            
-            # Combine base similarity with personalization
-            personalized_score = base_similarity * 0.6 + taste_similarity * 0.4
-            
-            # Apply preference penalties/boosts
-            if movie.title in self.user_preferences['disliked_movies']:
-                personalized_score *= 0.1  # Heavy penalty for disliked
-            
-            if any(genre in self.user_preferences['preferred_genres'] for genre in movie.genre.split('/')):
-                personalized_score *= 1.2  # Boost for preferred genres
+        scan_size = len(self.movies) if candidates is None else len(candidates)
+        if self.search_pool is not None and scan_size >= 2 * SHARD_MIN_ROWS:
+            # Steps 2-3 per shard on the search pool, keeping each shard's best rows; the workers
+            # interleave scoring and personalization, so both are timed as one stage
+            with self.metrics.time('sharded_scoring'):
+                candidates, similarities = self.score_shards(query_embedding, profile, shortlist_size, candidates)
+        else:
+            with self.metrics.time('similarity'):
+                similarities = self.similarity_scores(query_embedding, candidates)
             
-            enhanced_results.append((movie, personalized_score))
+            # Step 3: Apply AI-driven personalization
+            with self.metrics.time('personalization'):
+                similarities = self.apply_ai_personalization(similarities, candidates, profile)
+        
+        # Step 4: Partial top-k selection instead of sorting the catalog
+        with self.metrics.time('ranking'):
+            if rescore:
+                # Re-score the approximate shortlist from the float32 embeddings
+                shortlist = top_k_indices(similarities, shortlist_size)
+                candidates = shortlist if candidates is None else candidates[shortlist]
+                similarities = self.similarity_scores(query_embedding, candidates, exact=True)
+                similarities = self.apply_ai_personalization(similarities, candidates, profile, exact=True)
+            best = top_k_indices(similarities, depth)
+            rows = best if candidates is None else candidates[best]
+            if lexical_query is None:
+                return rows, similarities[best]
+            return self.fuse_lexical(lexical_query, rows, query_embedding, profile, allowed, num_results)
+    
+    def score_shards(self, query_embedding: np.ndarray, profile: UserProfile, k: int, candidates: np.ndarray = None):
+        """
+        Steps 2-3 of search split across the search pool
+        
+        Each worker scores and personalizes one shard, a view of the
+        embedding matrix (or a slice of the candidate rows), and keeps its
+        top k; the shards' winners are merged into the overall top k. NumPy
+        releases the GIL for the products, selection and masking, so the
+        shards run on separate cores without copying the matrix.
+        """
+        count = len(self.movies) if candidates is None else len(candidates)
+        num_shards = min(self.search_workers, max(1, count // SHARD_MIN_ROWS))
+        bounds = np.linspace(0, count, num_shards + 1).astype(np.int64).tolist()
+        shards = [slice(start, end) if candidates is None else candidates[start:end]
+                  for start, end in zip(bounds[:-1], bounds[1:])]
+        if profile is not None:
+            self.taste_vector(profile)  # Build the cached taste vector once, before the workers read it
+        
+        def score(shard):
+            similarities = self.apply_ai_personalization(self.similarity_scores(query_embedding, shard), shard, profile)
+            best = top_k_indices(similarities, k)
+            rows = best + shard.start if isinstance(shard, slice) else shard[best]
+            return rows, similarities[best]
+        
+        parts = list(self.search_pool.map(score, shards))
+        rows = np.concatenate([rows for rows, _ in parts])
+        scores = np.concatenate([scores for _, scores in parts])
+        best = top_k_indices(scores, k)
+        return rows[best], scores[best]
+    
+    def fuse_lexical(self, query: str, semantic_rows: np.ndarray, query_embedding: np.ndarray,
+                     profile: UserProfile, allowed: np.ndarray, num_results: int):
+        """
+        Hybrid ranking by reciprocal rank fusion of semantic and BM25 results
+        
+        Each retriever contributes up to max(num_results, RRF_DEPTH) ranked
+        rows; the user's disliked movies are dropped from the keyword ranking,
+        so keyword matches cannot lift them past their penalized semantic
+        rank. Fusion picks the results, which are then ordered by their
+        personalized semantic similarity: that is the reported score, so it
+        stays comparable with purely semantic searches and agrees with the
+        order.
+        """
+        lexical_rows, _ = self.lexical_index.search(query, max(num_results, RRF_DEPTH), allowed)
+        if profile is not None and profile.disliked:
+            lexical_rows = lexical_rows[~np.isin(lexical_rows, list(profile.disliked))]
+        rows = reciprocal_rank_fusion([semantic_rows, lexical_rows])[:num_results]
+        scores = self.similarity_scores(query_embedding, rows, exact=True)
+        scores = self.apply_ai_personalization(scores, rows, profile, exact=True)
+        order = np.argsort(-scores, kind='stable')
+        return rows[order], scores[order]
+    
+    def results_for_rows(self, rows, scores) -> List[tuple]:
+        return [(self.movies[row], float(score)) for row, score in zip(rows, scores)]
+    
+    def apply_ai_personalization(self, similarities: np.ndarray, candidates: np.ndarray = None,
+                                 profile: UserProfile = None, exact: bool = False) -> np.ndarray:
+        """
+        Apply CineRAG-AI personalization algorithms
+        
+        Re-ranks base similarities for the candidate rows (an array or slice;
+        the whole catalog when None) in a single vectorized pass. similarities
+        may also be a (queries x candidates) matrix. Taste alignment uses
+        the quantized embeddings when enabled, unless exact is set.
+        """
+        # User taste profile, maintained incrementally as likes arrive
+        user_taste_vector = None if profile is None else self.taste_vector(profile)
+        if user_taste_vector is None:
+            return similarities
         
-        return enhanced_results
+        rows = slice(None) if candidates is None else candidates
+        
+        # Calculate taste alignment (rows are already unit length)
+        taste_similarities = self.similarity_scores(user_taste_vector, candidates, exact)
+        
+        # Combine base similarity with personalization
+        personalized_scores = similarities * 0.6 + taste_similarities * 0.4
+        
+        # Apply preference penalties/boosts, indexing only the candidate rows (a shard scores a slice)
+        disliked = np.fromiter(profile.disliked, dtype=np.int64, count=len(profile.disliked))
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(len(self.movies))
+            disliked = disliked[(disliked >= start) & (disliked < stop)] - start
+        else:
+            disliked = np.flatnonzero(np.isin(rows, disliked))
+        personalized_scores[..., disliked] *= 0.1  # Heavy penalty for disliked
+        if profile.preferred_genres:
+            personalized_scores[..., self.genre_mask(profile.preferred_genres, rows)] *= 1.2  # Boost for preferred genres
+        
+        return personalized_scores
+    
+    def taste_vector(self, profile: UserProfile) -> np.ndarray:
+        """The profile's unit taste vector, rebuilt from its likes if it was saved without one"""
+        if profile.taste_encoder != self.encoder_identity:
+            if profile.taste_encoder is not None:
+                profile.reset_taste()  # Built in another embedding space; time decay restarts
+            profile.taste_encoder = self.encoder_identity
+            self.profiles.mark_dirty(profile)
+        if profile.liked and profile.taste_sum is None:
+            liked_rows = np.fromiter(profile.liked, dtype=np.int64, count=len(profile.liked))
+            profile.taste_sum = self.movie_embeddings.vectors[liked_rows].sum(axis=0)
+            profile.taste_count = len(liked_rows)
+            self.profiles.mark_dirty(profile)
+        return profile.taste_vector(decayed=self.taste_half_life is not None)
     
-    def learn_user_preference(self, movie_title: str, preference_type: str):
-        """CineRAG-AI learning system for user preferences"""
-        timestamp = datetime.now().isoformat()
+    def learn_user_preference(self, movie_title: str, preference_type: str, user_id: str = DEFAULT_USER):
+        """
+        CineRAG-AI learning system for user preferences
+        
+        The event is applied to the user's profile in memory and appended to
+        the interaction log; profiles are only written when the log is
+        compacted or a profile leaves the in-memory cache.
+        """
+        movie_id = self.title_index.lookup(movie_title)
+        if movie_id is None:
+            print(f"❓ CineRAG-AI doesn't know the movie '{movie_title}'")
+            suggestions = self.suggest_titles(movie_title)
+            if suggestions:
+                print(f"💡 Did you mean: {', '.join(suggestions)}?")
+            return
+        
+        self.event_seq += 1
+        event = {
+            'seq': self.event_seq,
+            'user': user_id,
+            'movie_id': movie_id,
+            'action': preference_type,
+            'timestamp': datetime.now().isoformat()
+        }
         
-        if preference_type == "like":
-            if movie_title not in self.user_preferences['liked_movies']:
-                self.user_preferences['liked_movies'].append(movie_title)
+        if self.apply_interaction(event):
+            if preference_type == "like":
                 print(f"👍 CineRAG-AI learned: You liked {movie_title}")
+            elif preference_type == "dislike":
+                print(f"👎 CineRAG-AI learned: You disliked {movie_title}")
+        
+        self.interaction_log.append(event)
+        self.metrics.increment('interactions')
+        print("🧠 CineRAG-AI updated your preference profile!")
+        
+        if self.interaction_log.entries >= LOG_COMPACT_EVENTS:
+            self.save_profiles()
+    
+    def suggest_titles(self, title: str, limit: int = 3) -> List[str]:
+        """Catalog titles closest to a possibly misspelled one"""
+        return [self.movies.titles[movie_id] for movie_id, _ in self.title_index.fuzzy(title, limit)]
+    
+    def apply_interaction(self, event: Dict) -> bool:
+        """Apply one preference event to its user's profile; True if it changed likes/dislikes"""
+        profile = self.profiles.get(event['user'])
+        if event['seq'] <= profile.event_seq:
+            return False  # Already captured by the saved profile
+        
+        movie_id = event['movie_id']
+        changed = False
+        
+        if event['action'] == "like":
+            if movie_id not in profile.liked:
+                self.taste_vector(profile)  # Make sure older profiles have a running sum
+                profile.liked.add(movie_id)
+                profile.add_liked_embedding(self.movie_embeddings[movie_id],
+                                            datetime.fromisoformat(event['timestamp']).timestamp(),
+                                            self.taste_half_life)
+                changed = True
                 
                 # Extract genre preferences
-                for movie in self.movies:
-                    if movie.title == movie_title:
-                        for genre in movie.genre.split('/'):
-                            if genre not in self.user_preferences['preferred_genres']:
-                                self.user_preferences['preferred_genres'].append(genre)
+                for genre in self.movies[movie_id].genre.split('/'):
+                    if genre not in profile.preferred_genres:
+                        profile.preferred_genres.append(genre)
                 
-        elif preference_type == "dislike":
-            if movie_title not in self.user_preferences['disliked_movies']:
-                self.user_preferences['disliked_movies'].append(movie_title)
-                print(f"👎 CineRAG-AI learned: You disliked {movie_title}")
+        elif event['action'] == "dislike":
+            if movie_id not in profile.disliked:
+                profile.disliked.add(movie_id)
+                changed = True
         
         # Log interaction for advanced learning
-        self.user_preferences['interaction_history'].append({
-            'movie': movie_title,
-            'action': preference_type,
-            'timestamp': timestamp
-        })
+        profile.recent_history.append((movie_id, event['action']))
+        profile.interaction_count += 1
+        profile.event_seq = event['seq']
+        self.profiles.mark_dirty(profile)
         
-        print("🧠 CineRAG-AI updated your preference profile!")
-        self.save_system_data()
+        return changed
     
-    def get_ai_recommendations(self, num_results: int = 5) -> List[tuple]:
-        """Get personalized recommendations from CineRAG-AI"""
-        if not self.user_preferences['liked_movies']:
+    def get_ai_recommendations(self, num_results: int = 5, user_id: str = DEFAULT_USER,
+                               strategy: str = 'centroid') -> List[tuple]:
+        """
+        Get personalized recommendations from CineRAG-AI
+        
+        Scores the catalog straight from stored embeddings: against the
+        user's taste centroid, or with strategy='multi' against up to
+        RECOMMENDATION_CENTROIDS clusters of their liked movies (best match
+        wins), so eclectic tastes are not averaged away. Liked and disliked
+        movies are excluded. Results are cached until the user's profile or
+        the catalog changes.
+        """
+        profile = self.profiles.get(user_id)
+        if not profile.liked:
             print("🤔 CineRAG-AI needs to learn your preferences first!")
             print("💡 Try searching and rating some movies!")
             return []
         
-        # Generate recommendation query from user profile
-        preferred_content = " ".join([
-            f"{movie.genre} {movie.description}" 
-            for movie in self.movies 
-            if movie.title in self.user_preferences['liked_movies']
-        ])
+        key = (user_id, num_results, strategy)
+        versions = (self.catalog_version, profile.event_seq)
+        cached = self.recommendation_cache.get(key, valid=lambda entry: entry[0] == versions)
+        self.metrics.increment('recommendations')
+        if cached is not None:
+            return cached[1]
         
-        recommendation_query = f"movies similar to {preferred_content}"
+        with self.metrics.time('recommendations'):
+            if strategy == 'multi':
+                liked_rows = np.fromiter(profile.liked, dtype=np.int64, count=len(profile.liked))
+                centroids = spherical_kmeans(self.movie_embeddings.vectors[liked_rows], RECOMMENDATION_CENTROIDS)
+                scores = np.max([self.similarity_scores(centroid) for centroid in centroids], axis=0)
+            elif strategy == 'centroid':
+                scores = self.similarity_scores(self.taste_vector(profile))
+            else:
+                raise ValueError(f"Unknown recommendation strategy: {strategy}")
         
-        return self.intelligent_movie_search(recommendation_query, num_results)
+            scores[self.genre_mask(profile.preferred_genres)] *= 1.2  # Boost for preferred genres
+            seen = list(profile.liked | profile.disliked)
+            scores[seen] = -np.inf
+        
+            results = [(self.movies[row], float(scores[row]))
+                       for row in top_k_indices(scores, min(num_results, len(self.movies) - len(seen)))]
+            self.recommendation_cache.put(key, (versions, results))
+            return results
     
-    def display_movie_database(self):
+    def display_movie_database(self, user_id: str = DEFAULT_USER):
         """Display CineRAG-AI movie database"""
         if not self.movies:
             print("📭 CineRAG-AI database is empty!")
             return
         
+        profile = self.profiles.get(user_id)
         print(f"\n📚 CineRAG-AI Database ({len(self.movies)} movies):")
         print("=" * 60)
         
-        for i, movie in enumerate(self.movies, 1):
+        for movie_id, movie in enumerate(self.movies):
             status = ""
-            if movie.title in self.user_preferences['liked_movies']:
+            if movie_id in profile.liked:
                 status = " 👍"
-            elif movie.title in self.user_preferences['disliked_movies']:
+            elif movie_id in profile.disliked:
                 status = " 👎"
             
-            print(f"{i}. {movie}{status}")
+            print(f"{movie_id + 1}. {movie}{status}")
             print(f"   📝 {movie.description[:80]}...")
             print()
     
     def save_system_data(self):
-        """Save CineRAG-AI data persistence"""
-        try:
-            system_data = {
-                'movies': self.movies,
-                'movie_embeddings': self.movie_embeddings,
-                'user_preferences': self.user_preferences,
-                'system_version': 'CineRAG-AI v1.0'
-            }
-            
-            with open('cinerag_ai_data.pkl', 'wb') as f:
-                pickle.dump(system_data, f)
-            
-            print("💾 CineRAG-AI data saved successfully!")
-        except Exception as e:
-            print(f"⚠️ CineRAG-AI save error: {e}")
+        """
+        Save CineRAG-AI data persistence
+        
+        The catalog (embeddings, movie metadata, ANN index, quantized codes)
+        is only rewritten when it changed; modified user profiles are always
+        flushed. A catalog save goes to a new snapshot directory that
+        catalog.json switches to last, so an interrupted save leaves the
+        previous snapshot whole.
+        """
+        with self.metrics.time('save'):
+            try:
+                os.makedirs(DATA_DIR, exist_ok=True)
+                
+                if self.catalog_dirty or not os.path.exists(CATALOG_FILE):
+                    snapshot = uuid.uuid4().hex
+                    snapshot_dir = f"{CATALOG_SNAPSHOT_DIR}-{snapshot}"
+                    self.movies.save(snapshot_dir)
+                    embeddings_file, ann_file, quantized_file, lexical_file, title_file = \
+                        (os.path.join(snapshot_dir, os.path.basename(path)) for path in snapshot_files())
+                    write_file_atomically(embeddings_file, lambda f: np.save(f, self.movie_embeddings.vectors))
+                    self.lexical_index.save(lexical_file, snapshot)
+                    self.title_index.save(title_file, snapshot)
+                    if self.ann_index is not None and self.ann_index.is_trained:
+                        self.ann_index.save(ann_file)
+                    if self.quantized is not None and self.quantized.is_trained:
+                        self.quantized.save(quantized_file)
+                    
+                    catalog = {
+                        'system_version': SYSTEM_VERSION,
+                        'encoder': self.encoder_identity,
+                        'snapshot': snapshot,
+                        'columns': os.path.basename(snapshot_dir)
+                    }
+                    write_file_atomically(CATALOG_FILE, lambda f: json.dump(catalog, f), mode='w')
+                    self.remove_stale_snapshots(snapshot_dir)
+                    self.catalog_dirty = False
+                
+                self.save_profiles()
+                
+                print("💾 CineRAG-AI data saved successfully!")
+            except Exception as e:
+                print(f"⚠️ CineRAG-AI save error: {e}")
     
-    def load_system_data(self):
-        """Load CineRAG-AI saved data"""
-        try:
-            with open('cinerag_ai_data.pkl', 'rb') as f:
-                system_data = pickle.load(f)
-            
-            self.movies = system_data.get('movies', [])
-            self.movie_embeddings = system_data.get('movie_embeddings', [])
-            self.user_preferences = system_data.get('user_preferences', {
-                'liked_movies': [],
-                'disliked_movies': [],
-                'preferred_genres': [],
-                'interaction_history': []
-            })
-            
-            print(f"💾 CineRAG-AI loaded {len(self.movies)} movies and your profile!")
-        except FileNotFoundError:
-            print("📝 CineRAG-AI starting fresh - building new profile!")
-        except Exception as e:
-            print(f"⚠️ CineRAG-AI load error: {e}")
+    def remove_stale_snapshots(self, current: str):
+        """Delete catalog snapshots from earlier (or interrupted) saves, including pre-snapshot files"""
+        for name in os.listdir(DATA_DIR):
+            path = os.path.join(DATA_DIR, name)
+            if path.startswith((f"{CATALOG_SNAPSHOT_DIR}-", os.path.join(DATA_DIR, 'columns-'))) and path != current:
+                shutil.rmtree(path, ignore_errors=True)  # Processes still mapping the files keep their copy
+        for path in snapshot_files():
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def save_profiles(self):
+        """Flush modified user profiles and compact the interaction log into them"""
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        self.interaction_log.sync()
+        self.profiles.flush()
+        write_file_atomically(PROFILE_STATE_FILE, lambda f: json.dump({'event_seq': self.event_seq}, f), mode='w')
+        # Each profile records its last applied event, so replay skips them if truncation is lost
+        self.interaction_log.truncate()
+    
+    def load_system_data(self, reencode: bool = False):
+        """
+        Load CineRAG-AI saved data
+        
+        Embeddings and metadata columns are memory-mapped read-only, so
+        startup does not parse or copy them and several processes share one
+        page-cache copy. Data saved by older versions (a single pickle, or
+        catalog.json holding every movie) is migrated on the next save.
+        
+        A catalog encoded by another encoder raises EncoderMismatchError,
+        since re-embedding it can take hours; pass reencode=True to do so.
+        """
+        with self.metrics.time('load'):
+            try:
+                legacy_preferences = None
+                lexical_index = title_index = None
+                catalog_encoder = MODEL_NAME  # Older saves were all encoded by the default model
+                if os.path.exists(CATALOG_FILE):
+                    with open(CATALOG_FILE) as f:
+                        catalog = json.load(f)
+                    snapshot_dir = None
+                    if 'columns' in catalog:
+                        snapshot_dir = os.path.join(DATA_DIR, catalog['columns'])
+                        self.movies = MovieCatalog.load(snapshot_dir)
+                    else:
+                        self.movies = MovieCatalog(Movie(*row) for row in catalog['movies'])
+                        self.catalog_dirty = True
+                    catalog_encoder = catalog.get('encoder', catalog_encoder)
+                    embeddings_file, ann_file, quantized_file, lexical_file, title_file = snapshot_files(snapshot_dir)
+                    self.movie_embeddings = EmbeddingMatrix.from_mapped(np.load(embeddings_file, mmap_mode='r'))
+                    if 'snapshot' in catalog and os.path.exists(lexical_file):
+                        lexical_index = LexicalIndex.load(lexical_file, catalog['snapshot'])
+                    if 'snapshot' in catalog and os.path.exists(title_file):
+                        title_index = TitleIndex.load(title_file, self.movies.titles, catalog['snapshot'])
+                    
+                    if os.path.exists(PROFILE_STATE_FILE):
+                        with open(PROFILE_STATE_FILE) as f:
+                            self.event_seq = json.load(f)['event_seq']
+                    
+                    if os.path.exists(ann_file):
+                        self.ann_index = IVFIndex.load(ann_file)
+                    if os.path.exists(quantized_file):
+                        self.quantized = QuantizedEmbeddings.load(quantized_file)
+                else:
+                    with open(LEGACY_DATA_FILE, 'rb') as f:
+                        system_data = pickle.load(f)
+                    
+                    self.movies = MovieCatalog(system_data.get('movies', []))
+                    self.movie_embeddings = EmbeddingMatrix.from_array(system_data.get('movie_embeddings', []))
+                    legacy_preferences = system_data.get('user_preferences')
+                    self.catalog_dirty = True
+                
+                self.rebuild_indexes(lexical_index, title_index)
+                if catalog_encoder != self.encoder_identity:
+                    if not reencode:
+                        raise EncoderMismatchError(
+                            f"CineRAG-AI catalog was encoded with {catalog_encoder}, not {self.encoder_identity}; "
+                            f"use the same encoder, or re-embed the catalog with reencode=True (--reencode)")
+                    print(f"⚠️ CineRAG-AI catalog was encoded with {catalog_encoder}, not {self.encoder_identity}")
+                    self.reencode_catalog()
+                elif len(self.movie_embeddings) != len(self.movies):
+                    # Only older saves, which replaced files one at a time, can get here
+                    print(f"⚠️ CineRAG-AI found {len(self.movie_embeddings)} embeddings for {len(self.movies)} movies")
+                    self.reencode_catalog()
+                for name, index in (('ANN index', self.ann_index), ('quantized embeddings', self.quantized)):
+                    # An index that does not cover the catalog would hide or misplace rows
+                    if index is not None and index.is_trained and len(index) != len(self.movies):
+                        print(f"⚠️ CineRAG-AI {name} covers {len(index)} of {len(self.movies)} movies; retraining")
+                        index.train(self.movie_embeddings.vectors)
+                        self.catalog_dirty = True
+                self.migrate_legacy_preferences(legacy_preferences)
+                
+                # Replay feedback recorded since profiles were last flushed
+                for event in self.interaction_log.replay():
+                    self.apply_interaction(event)
+                    self.event_seq = max(self.event_seq, event['seq'])
+                
+                print(f"💾 CineRAG-AI loaded {len(self.movies)} movies and your profile!")
+            except FileNotFoundError:
+                print("📝 CineRAG-AI starting fresh - building new profile!")
+            except EncoderMismatchError:
+                raise
+            except Exception as e:
+                print(f"⚠️ CineRAG-AI load error: {e}")
+    
+    def migrate_legacy_preferences(self, preferences: Dict):
+        """Turn the single-user preferences of older versions into the default profile"""
+        if not preferences:
+            return
+        profile = self.profiles.get(DEFAULT_USER)
+        profile.liked = set(self.rows_for_titles(preferences['liked_movies']).tolist())
+        profile.disliked = set(self.rows_for_titles(preferences['disliked_movies']).tolist())
+        profile.preferred_genres = list(preferences['preferred_genres'])
+        for interaction in preferences['interaction_history']:
+            movie_id = self.title_index.lookup(interaction['movie'])
+            if movie_id is not None:
+                profile.recent_history.append((movie_id, interaction['action']))
+        profile.interaction_count = len(preferences['interaction_history'])
+        self.profiles.mark_dirty(profile)
     
     def add_custom_movie(self):
         """Add custom movie to CineRAG-AI database"""
@@ -351,33 +2955,35 @@ class CineRAGAI:
         else:
             print("❌ Title and description are required!")
     
-    def show_user_analytics(self):
+    def show_user_analytics(self, user_id: str = DEFAULT_USER):
         """Display CineRAG-AI user analytics"""
-        prefs = self.user_preferences
+        profile = self.profiles.get(user_id)
         
         print("\n📊 CineRAG-AI User Analytics:")
         print("=" * 40)
         print(f"🎬 Movies in database: {len(self.movies)}")
-        print(f"👍 Movies you liked: {len(prefs['liked_movies'])}")
-        print(f"👎 Movies you disliked: {len(prefs['disliked_movies'])}")
-        print(f"🎭 Preferred genres: {len(prefs['preferred_genres'])}")
-        print(f"📈 Total interactions: {len(prefs['interaction_history'])}")
+        print(f"👍 Movies you liked: {len(profile.liked)}")
+        print(f"👎 Movies you disliked: {len(profile.disliked)}")
+        print(f"🎭 Preferred genres: {len(profile.preferred_genres)}")
+        print(f"📈 Total interactions: {profile.interaction_count}")
         
-        if prefs['liked_movies']:
+        recent_likes = [movie_id for movie_id, action in profile.recent_history
+                        if action == 'like' and movie_id in profile.liked]
+        if recent_likes:
             print(f"\n💖 Your favorite movies (last 5):")
-            for movie_title in prefs['liked_movies'][-5:]:
-                print(f"  • {movie_title}")
+            for movie_id in list(dict.fromkeys(recent_likes))[-5:]:
+                print(f"  • {self.movies[movie_id].title}")
         
-        if prefs['preferred_genres']:
+        if profile.preferred_genres:
             print(f"\n🎭 Your preferred genres:")
-            for genre in prefs['preferred_genres'][:5]:
+            for genre in profile.preferred_genres[:5]:
                 print(f"  • {genre}")
         
         # Calculate recommendation accuracy
-        if len(prefs['interaction_history']) > 5:
-            recent_likes = sum(1 for interaction in prefs['interaction_history'][-10:] 
-                             if interaction['action'] == 'like')
-            accuracy = (recent_likes / min(10, len(prefs['interaction_history']))) * 100
+        if profile.interaction_count > 5:
+            recent = list(profile.recent_history)[-10:]
+            recent_likes = sum(1 for _, action in recent if action == 'like')
+            accuracy = (recent_likes / len(recent)) * 100
             print(f"\n🎯 Recent recommendation accuracy: {accuracy:.1f}%")
 
 def launch_cinerag_ai():
@@ -388,7 +2994,7 @@ def launch_cinerag_ai():
     print("🧠 Using Advanced Retrieval-Augmented Generation")
     
     # Initialize CineRAG-AI system
-    cinerag = CineRAGAI()
+    cinerag = CineRAGAI(preload_model=True)
     
     while True:
         print("\n🎯 CineRAG-AI Main Menu:")
@@ -443,12 +3049,11 @@ def launch_cinerag_ai():
                 print("🎬 Movies CineRAG-AI thinks you'll love:")
                 print("=" * 50)
                 
+                # Already rated movies are excluded by the engine
                 for i, (movie, score) in enumerate(recommendations, 1):
-                    # Don't recommend already liked movies
-                    if movie.title not in cinerag.user_preferences['liked_movies']:
-                        print(f"{i}. {movie} (AI Confidence: {score:.1%})")
-                        print(f"   📝 {movie.description}")
-                        print()
+                    print(f"{i}. {movie} (AI Confidence: {score:.1%})")
+                    print(f"   📝 {movie.description}")
+                    print()
             else:
                 print("🤔 CineRAG-AI needs more data about your preferences!")
                 print("💡 Try searching and rating movies first!")
@@ -467,6 +3072,7 @@ def launch_cinerag_ai():
         
         elif choice == "6":
             # Exit
+            cinerag.interaction_log.close()
             print("👋 Thank you for using CineRAG-AI!")
             print("🎬 Keep discovering amazing movies!")
             break
@@ -481,7 +3087,7 @@ def cinerag_ai_demo():
     print("=" * 40)
     
     # Initialize system
-    cinerag = CineRAGAI()
+    cinerag = CineRAGAI(preload_model=True)
     
     # Demo searches
     demo_queries = [
@@ -502,6 +3108,12 @@ def cinerag_ai_demo():
         else:
             print("  No results found")
     
+    # Structured filters narrow the catalog before semantic scoring
+    print("\nQuery: 'space adventure' (Sci-Fi, rating 7.5+)")
+    filters = SearchFilters(genres=["Sci-Fi"], min_rating=7.5)
+    for i, (movie, score) in enumerate(cinerag.intelligent_movie_search("space adventure", 3, filters=filters), 1):
+        print(f"  {i}. {movie.title} (Score: {score:.3f})")
+    
     print("\n🤖 CineRAG-AI Demo Complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,338 @@
+# 🎬 CineRAG-AI - Async HTTP Serving Layer
+# Search, recommendations and feedback over HTTP, with micro-batched AI encoding
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from main import (DEFAULT_USER, CineRAGAI, SearchFilters, add_encoder_arguments, encoder_from_args,
+                  normalize_embeddings, normalize_query)
+
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error'
+}
+MAX_BODY_BYTES = 1 << 20
+MAX_RESULTS = 100  # Largest n a request may ask for
+
+class MicroBatcher:
+    """
+    Coalesces concurrent encode requests into batches for the AI model
+
+    The first queued text opens a batch; it is sent to the encoder once it
+    holds max_batch_size texts or max_wait_ms has passed. Encoding runs on
+    a single worker thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, encode_batch, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._queue: asyncio.Queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cinerag-encoder')
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def encode(self, text: str) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self.encode_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+class CineRAGServer:
+    """
+    Minimal asyncio HTTP/1.1 server for CineRAG-AI
+
+    Endpoints:
+        GET  /search?q=...&n=5&user=...      Personalized hybrid (semantic + keyword) search, optionally
+                                             filtered by &genre=a,b &year_min= &year_max= &min_rating=
+        GET  /recommendations?n=5&user=...   Recommendations from the user's profile
+                                             (&strategy=multi for multi-centroid)
+        POST /feedback                       {"user": ..., "title": ..., "action": "like" | "dislike"}
+        GET  /stats                          Catalog, cache and batching counters plus stage histograms
+        GET  /metrics                        The same counters in Prometheus text format
+
+    Requests without a user ID use the default profile; n may be 1 to MAX_RESULTS.
+
+    Scoring and profile updates run on the event loop thread; only model
+    inference is handed to the micro-batcher's worker thread.
+    """
+
+    def __init__(self, cinerag: CineRAGAI, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.cinerag = cinerag
+        self.batcher = MicroBatcher(self.encode_uncached, max_batch_size, max_wait_ms)
+        cinerag.metrics.register_gauge('encoder_batches', lambda: self.batcher.batches)
+        cinerag.metrics.register_gauge('encoder_batched_queries', lambda: self.batcher.items)
+        self.pending: Dict[str, asyncio.Future] = {}  # Queries waiting on the encoder
+        self.routes = {
+            '/search': ('GET', self.handle_search),
+            '/recommendations': ('GET', self.handle_recommendations),
+            '/feedback': ('POST', self.handle_feedback),
+            '/stats': ('GET', self.handle_stats),
+            '/metrics': ('GET', self.handle_metrics)
+        }
+
+    def encode_uncached(self, keys: List[str]) -> np.ndarray:
+        """Encode a micro-batch of normalized queries and remember them in the query cache"""
+        with self.cinerag.metrics.time('encode'):
+            embeddings = normalize_embeddings(self.cinerag.ai_model.encode(keys, batch_size=len(keys)))
+        for key, embedding in zip(keys, embeddings):
+            self.cinerag.query_cache.put(key, embedding)
+        return embeddings
+
+    async def encode_query(self, query: str) -> np.ndarray:
+        key = normalize_query(query)
+        embedding = self.cinerag.query_cache.get(key)
+        if embedding is None:
+            # Identical queries arriving together share one encode
+            pending = self.pending.get(key)
+            if pending is None:
+                pending = asyncio.ensure_future(self.batcher.encode(key))
+                self.pending[key] = pending
+                pending.add_done_callback(lambda _: self.pending.pop(key, None))
+            embedding = await asyncio.shield(pending)
+        return embedding
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🌐 CineRAG-AI serving on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+            self.cinerag.interaction_log.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {'error': 'request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {'error': f'unknown endpoint {url.path}'}
+        allowed_method, handler = route
+        if method != allowed_method:
+            return 405, {'error': f'{url.path} expects {allowed_method}'}
+
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            return await handler(params, body)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            print(f"⚠️ CineRAG-AI server error: {e}")
+            return 500, {'error': 'internal error'}
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool = True):
+        # Dicts are sent as JSON, strings as plain text
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload).encode(), 'application/json'
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle_search(self, params: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        query = params.get('q', '').strip()
+        if not query:
+            raise ValueError("missing query parameter 'q'")
+        num_results = self.parse_count(params)
+
+        user_id = params.get('user', DEFAULT_USER)
+
+        filters = self.parse_filters(params)
+
+        # Repeat searches and title queries skip the encoder; others wait on the micro-batcher
+        steps = self.cinerag.lookup_or_search(query, num_results, user_id, filters)
+        try:
+            steps.send(await self.encode_query(next(steps)))
+        except StopIteration as finished:
+            results = finished.value
+        return 200, {'query': query, 'user': user_id, 'results': self.serialize(results)}
+
+    async def handle_recommendations(self, params: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        num_results = self.parse_count(params)
+        user_id = params.get('user', DEFAULT_USER)
+        strategy = params.get('strategy', 'centroid')
+        if not self.cinerag.profiles.get(user_id).liked:
+            return 200, {'user': user_id, 'results': []}
+
+        # Computed from stored embeddings, so no encoder round-trip
+        results = self.cinerag.get_ai_recommendations(num_results, user_id, strategy)
+        return 200, {'user': user_id, 'results': self.serialize(results)}
+
+    async def handle_feedback(self, params: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        try:
+            feedback = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            raise ValueError("feedback body must be JSON")
+        if not isinstance(feedback, dict):
+            raise ValueError("feedback body must be a JSON object")
+        user_id = feedback.get('user', DEFAULT_USER)
+        if isinstance(user_id, bool) or not isinstance(user_id, (str, int)):
+            raise ValueError("feedback 'user' must be a string")
+        user_id = str(user_id)
+        title = feedback.get('title')
+        action = feedback.get('action')
+        if not isinstance(title, str) or not title or action not in ('like', 'dislike'):
+            raise ValueError("feedback needs a string 'title' and an 'action' of 'like' or 'dislike'")
+        if title not in self.cinerag.title_index:
+            return 404, {'error': f"unknown movie '{title}'", 'suggestions': self.cinerag.suggest_titles(title)}
+
+        self.cinerag.learn_user_preference(title, action, user_id)
+        return 200, {'status': 'recorded', 'user': user_id, 'title': title, 'action': action}
+
+    async def handle_stats(self, params: Dict[str, str], body: bytes) -> Tuple[int, Dict]:
+        return 200, {
+            'movies': len(self.cinerag.movies),
+            'query_cache': self.cinerag.query_cache.stats(),
+            'result_cache': self.cinerag.result_cache.stats(),
+            'encoder_batching': self.batcher.stats(),
+            'metrics': self.cinerag.metrics.stats()
+        }
+
+    async def handle_metrics(self, params: Dict[str, str], body: bytes) -> Tuple[int, str]:
+        return 200, self.cinerag.metrics.prometheus_text()
+
+    @staticmethod
+    def parse_count(params: Dict[str, str]) -> int:
+        try:
+            num_results = int(params.get('n', 5))
+        except ValueError:
+            raise ValueError("'n' must be an integer")
+        if not 1 <= num_results <= MAX_RESULTS:
+            raise ValueError(f"'n' must be between 1 and {MAX_RESULTS}")
+        return num_results
+
+    @staticmethod
+    def parse_filters(params: Dict[str, str]) -> SearchFilters:
+        genres = [genre for genre in params.get('genre', '').split(',') if genre.strip()]
+        return SearchFilters(
+            genres=genres or None,
+            year_min=int(params['year_min']) if 'year_min' in params else None,
+            year_max=int(params['year_max']) if 'year_max' in params else None,
+            min_rating=float(params['min_rating']) if 'min_rating' in params else None
+        )
+
+    @staticmethod
+    def serialize(results: List[tuple]) -> List[Dict]:
+        return [dict(movie.asdict(), score=score) for movie, score in results]
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve CineRAG-AI over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=32,
+                        help="Most queries encoded in one model call")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="Longest a query waits for its micro-batch to fill")
+    parser.add_argument('--search-workers', type=int, default=1,
+                        help="Threads scoring shards of large catalogs in parallel")
+    parser.add_argument('--no-metrics', dest='metrics', action='store_false',
+                        help="Disable per-stage timing histograms and counters")
+    add_encoder_arguments(parser)
+    args = parser.parse_args()
+
+    cinerag = CineRAGAI(preload_model=True, search_workers=args.search_workers, metrics=args.metrics,
+                        ai_model=encoder_from_args(parser, args), reencode=args.reencode)
+    server = CineRAGServer(cinerag, args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 CineRAG-AI server stopped")
+
+if __name__ == "__main__":
+    main()
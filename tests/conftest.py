@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import CineRAGAI, HashingEncoder
+
+@pytest.fixture
+def make_cinerag(tmp_path, monkeypatch):
+    """Build CineRAG-AI instances on the hashing encoder, with data under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    instances = []
+
+    def make(**options):
+        options.setdefault('ai_model', HashingEncoder())
+        cinerag = CineRAGAI(**options)
+        instances.append(cinerag)
+        return cinerag
+
+    yield make
+    for cinerag in instances:
+        cinerag.interaction_log.close()
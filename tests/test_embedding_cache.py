@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+import main
+from main import EmbeddingCache, HashingEncoder
+
+class CountingEncoder:
+    """HashingEncoder that records every text it is asked to encode"""
+
+    def __init__(self):
+        self.encoder = HashingEncoder()
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts += texts
+        return self.encoder.encode(texts)
+
+def test_cached_texts_skip_the_encoder(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(str(tmp_path), 'hashing')
+    first = cache.encode(['a dune', 'b batman', 'a dune'], encoder)
+    assert encoder.texts == ['a dune', 'b batman']  # Duplicates in one call are encoded once
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    # A fresh cache over the same directory reads the saved vectors back
+    reopened = EmbeddingCache(str(tmp_path), 'hashing')
+    again = reopened.encode(['b batman', 'c encanto'], encoder)
+    assert encoder.texts == ['a dune', 'b batman', 'c encanto']
+    assert (reopened.hits, reopened.misses) == (1, 1)
+    np.testing.assert_array_equal(again[0], first[1])
+    np.testing.assert_allclose(np.linalg.norm(again, axis=1), 1.0, rtol=1e-6)
+
+    # Another model never sees these vectors
+    other = EmbeddingCache(str(tmp_path), 'another model')
+    other.encode(['a dune'], encoder)
+    assert other.misses == 1
+
+def test_torn_append_is_dropped(tmp_path):
+    encoder = CountingEncoder()
+    cache = EmbeddingCache(str(tmp_path), 'hashing')
+    cache.encode(['a dune', 'b batman'], encoder)
+    with open(cache.vectors_path, 'ab') as f:
+        f.write(b'\0' * 100)  # Interrupted before the key was written
+
+    reopened = EmbeddingCache(str(tmp_path), 'hashing')
+    reopened.encode(['a dune', 'b batman', 'c encanto'], encoder)
+    assert (reopened.hits, reopened.misses) == (2, 1)
+    reopened.encode(['c encanto'], encoder)
+    assert reopened.hits == 3
+
+def test_reingesting_unchanged_movies_skips_the_encoder(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.interaction_log.close()
+    os.remove(main.CATALOG_FILE)  # The catalog is gone, but its embeddings stay cached
+
+    reseeded = make_cinerag()
+    assert (reseeded.embedding_cache.hits, reseeded.embedding_cache.misses) == (len(cinerag.movies), 0)
+    np.testing.assert_array_equal(reseeded.movie_embeddings.vectors, cinerag.movie_embeddings.vectors)
@@ -0,0 +1,27 @@
+import gc
+import weakref
+
+import numpy as np
+
+from main import HashingEncoder, create_encoder, encoder_identity
+
+def test_hashing_encoder_is_deterministic_and_normalizable():
+    encoder = create_encoder('hashing', dimension=64)
+    vectors = encoder.encode(['a space adventure', 'a space adventure', 'family comedy'])
+    assert vectors.shape == (3, 64)
+    np.testing.assert_array_equal(vectors[0], vectors[1])
+    np.testing.assert_array_equal(encoder.encode('a space adventure'), vectors[0])
+    np.testing.assert_array_equal(HashingEncoder(dimension=64).encode('family comedy'), vectors[2])
+    assert encoder_identity(encoder) == 'hashing/64x8'
+
+def test_word_caches_are_per_encoder():
+    small, large = HashingEncoder(dimension=16), HashingEncoder(dimension=1024)
+    small.encode('dune'), large.encode('dune')
+    assert small.word_features.cache_info().currsize == large.word_features.cache_info().currsize == 1
+    assert small.word_features('dune')[0].max() < 16
+
+    # A discarded encoder and its cache are freed
+    reference = weakref.ref(large)
+    del large
+    gc.collect()
+    assert reference() is None
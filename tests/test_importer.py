@@ -0,0 +1,85 @@
+import csv
+import gzip
+import threading
+
+from importer import CatalogImporter, normalize_record
+
+def write_dump(path, count):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['title', 'year', 'genres', 'rating', 'overview'])
+        for i in range(count):
+            writer.writerow([f'Imported Movie {i}', 2000 + i % 20, 'Drama|Comedy', 6.5, f'Story number {i}'])
+        writer.writerow(['', '2001', 'Drama', '5', 'No title, rejected'])
+
+def test_import_resumes_after_limit(make_cinerag, tmp_path):
+    dump = tmp_path / 'dump.csv'
+    write_dump(dump, 50)
+
+    cinerag = make_cinerag()
+    seeded = len(cinerag.movies)
+    progress = CatalogImporter(cinerag, str(dump), batch_size=8).run(limit=20)
+    assert progress == dict(progress, added=20, records=20, complete=False)
+    cinerag.interaction_log.close()
+
+    restarted = make_cinerag()
+    assert len(restarted.movies) == seeded + 20
+    progress = CatalogImporter(restarted, str(dump), batch_size=8).run()
+    assert progress == dict(progress, added=50, records=51, rejected=1, complete=True)
+    assert len(restarted.movies) == seeded + 50
+    assert restarted.movies[seeded + 20].title == 'Imported Movie 20'
+    assert restarted.movies[seeded].genre == 'Drama/Comedy'
+
+    # A finished import is not repeated
+    assert CatalogImporter(restarted, str(dump)).run()['complete']
+    assert len(restarted.movies) == seeded + 50
+
+def test_import_skips_titles_already_in_catalog(make_cinerag, tmp_path):
+    dump = tmp_path / 'dump.csv'
+    write_dump(dump, 5)
+    with open(dump, 'a', newline='') as f:
+        csv.writer(f).writerows([['the batman', '2022', 'Action', '8', 'Duplicate'],
+                                 ['Imported Movie 3', '2003', 'Drama', '6', 'Duplicate']])
+
+    cinerag = make_cinerag()
+    seeded = len(cinerag.movies)
+    progress = CatalogImporter(cinerag, str(dump), batch_size=2).run()
+    assert progress['added'] == 5
+    assert len(cinerag.movies) == seeded + 5
+
+def test_list_fields_are_joined():
+    movie = normalize_record({'title': 'Arrival', 'genres': ['Sci-Fi', ' Drama ', None], 'year': 2016,
+                              'vote_average': 7.9, 'overview': 'Linguists meet visitors'})
+    assert (movie.genre, movie.year, movie.rating) == ('Sci-Fi/Drama', '2016', 7.9)
+    assert normalize_record({'title': 'Untitled', 'genre': []}).genre == ''
+
+def test_duplicates_skipped_while_in_flight_and_after_storing(make_cinerag, tmp_path):
+    dump = tmp_path / 'dump.csv'
+    write_dump(dump, 6)
+    with open(dump, 'a', newline='') as f:
+        csv.writer(f).writerows([['Imported Movie 0', '2000', 'Drama', '6', 'Duplicate']] * 5)
+
+    cinerag = make_cinerag()
+    importer = CatalogImporter(cinerag, str(dump), batch_size=2)
+    titles = []
+    for number, (batch, *_) in enumerate(importer.batches(0, threading.Event())):
+        titles += [movie.title for movie in batch]
+        if number == 0:
+            continue  # The first batch stays in flight for a while
+        cinerag.add_movie_batch(batch)
+    assert titles == [f'Imported Movie {i}' for i in range(6)]
+
+def test_imdb_tsv_dump_is_streamed_from_gzip(make_cinerag, tmp_path):
+    dump = tmp_path / 'title.basics.tsv.gz'
+    rows = [['tconst', 'titleType', 'primaryTitle', 'startYear', 'genres'],
+            ['tt1', 'movie', 'Quiet "Storm"', '1999', 'Drama,Romance'],
+            ['tt2', 'tvEpisode', 'Pilot', '2001', 'Comedy'],
+            ['tt3', 'movie', 'No Year', '\\N', '\\N']]
+    with gzip.open(dump, 'wt', encoding='utf-8') as f:
+        f.write(''.join('\t'.join(row) + '\n' for row in rows))
+
+    cinerag = make_cinerag(seed_catalog=False)
+    progress = CatalogImporter(cinerag, str(dump), title_types=['movie']).run()
+    assert progress == dict(progress, added=2, records=3, rejected=1, complete=True)
+    assert [movie.astuple()[:3] for movie in cinerag.movies] == [('Quiet "Storm"', '1999', 'Drama/Romance'),
+                                                                  ('No Year', '', '')]
@@ -0,0 +1,61 @@
+import json
+
+import main
+from main import INTERACTION_LOG_FILE, PROFILE_STATE_FILE
+
+def test_crash_replays_interaction_log(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('The Batman', 'like', 'u1')
+    cinerag.learn_user_preference('Dune', 'dislike', 'u1')
+    # Crash before profiles are flushed, mid-way through writing an event
+    cinerag.interaction_log.close()
+    with open(INTERACTION_LOG_FILE, 'a') as f:
+        f.write('{"seq": 3, "user": "u1", "mov')
+
+    restarted = make_cinerag()
+    profile = restarted.profiles.get('u1')
+    assert profile.liked == {restarted.title_index.lookup('The Batman')}
+    assert profile.disliked == {restarted.title_index.lookup('Dune')}
+    assert profile.interaction_count == 2
+    assert profile.taste_vector() is not None
+
+    # New events start on a fresh line after the torn one
+    restarted.learn_user_preference('Encanto', 'like', 'u1')
+    restarted.interaction_log.close()
+    again = make_cinerag()
+    assert len(again.profiles.get('u1').liked) == 2
+    assert again.event_seq == 3
+
+def test_compaction_flushes_profiles_and_truncates_log(make_cinerag, monkeypatch):
+    monkeypatch.setattr(main, 'LOG_COMPACT_EVENTS', 3)
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('The Batman', 'like', 'u1')
+    cinerag.learn_user_preference('Dune', 'like', 'u2')
+    assert cinerag.interaction_log.entries == 2
+    cinerag.learn_user_preference('Encanto', 'dislike', 'u1')
+
+    assert cinerag.interaction_log.entries == 0
+    with open(INTERACTION_LOG_FILE) as f:
+        assert f.read() == ''
+    with open(PROFILE_STATE_FILE) as f:
+        assert json.load(f) == {'event_seq': 3}
+    cinerag.interaction_log.close()
+
+    restarted = make_cinerag()
+    assert restarted.event_seq == 3
+    assert restarted.profiles.get('u1').interaction_count == 2
+    assert restarted.profiles.get('u2').liked == {restarted.title_index.lookup('Dune')}
+
+def test_replay_skips_events_already_in_profiles(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('The Batman', 'like', 'u1')
+    cinerag.interaction_log.close()
+    with open(INTERACTION_LOG_FILE) as f:
+        events = f.read()
+    cinerag.save_profiles()
+
+    # Compaction flushed the profile, but the log truncation was lost
+    with open(INTERACTION_LOG_FILE, 'w') as f:
+        f.write(events)
+    restarted = make_cinerag()
+    assert restarted.profiles.get('u1').interaction_count == 1
@@ -0,0 +1,44 @@
+import main
+from main import LRUCache
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats() == {'entries': 2, 'hits': 3, 'misses': 1, 'hit_rate': 0.75}
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, 'monotonic', lambda: now[0])
+    cache = LRUCache(ttl_seconds=60)
+    cache.put('query', 'vector')
+    now[0] += 59
+    assert cache.get('query') == 'vector'
+    now[0] += 2
+    assert cache.get('query', 'default') == 'default'
+    assert (len(cache), cache.hits, cache.misses) == (0, 1, 1)
+
+def test_byte_budget_evicts_and_skips_oversized_values():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.put('c', 'xxxx')
+    assert (cache.get('a'), len(cache), cache.nbytes) == (None, 2, 8)
+    cache.put('huge', 'x' * 11)
+    assert (cache.get('huge'), len(cache)) == (None, 2)
+    assert cache.stats()['bytes'] == 8
+
+def test_repeated_queries_skip_the_encoder(make_cinerag):
+    cinerag = make_cinerag()
+    calls = []
+    encode = cinerag.ai_model.encode
+    cinerag.ai_model.encode = lambda texts, **options: calls.append(list(texts)) or encode(texts, **options)
+    cinerag.intelligent_movie_search('Space  Adventure', 3, hybrid=False)
+    cinerag.result_cache.clear()
+    cinerag.intelligent_movie_search('space adventure', 3, hybrid=False)
+    assert len(calls) == 1  # Query text is normalized before the cache lookup
+    assert (cinerag.query_cache.hits, cinerag.query_cache.misses) == (1, 1)
@@ -0,0 +1,40 @@
+import asyncio
+
+from main import LATENCY_BUCKETS, Metrics
+from server import CineRAGServer
+
+def test_search_stages_are_timed_and_exported(make_cinerag):
+    cinerag = make_cinerag(metrics=True)
+    cinerag.learn_user_preference('Dune', 'like', 'u1')
+    cinerag.intelligent_movie_search('space adventure', 3, 'u1', hybrid=False)
+    cinerag.intelligent_movie_search('the batman', 3)
+
+    stats = cinerag.metrics.stats()
+    for stage in ('load', 'encode', 'similarity', 'personalization', 'ranking'):
+        histogram = stats['stages'][stage]
+        assert histogram['count'] >= 1
+        assert histogram['buckets']['+Inf'] == histogram['count']
+    assert stats['counters'] == dict(stats['counters'], queries=2, title_fast_path=1, interactions=1)
+    assert stats['gauges']['catalog_movies'] == len(cinerag.movies)
+
+    text = cinerag.metrics.prometheus_text()
+    assert '# TYPE cinerag_stage_seconds histogram' in text
+    assert 'cinerag_stage_seconds_bucket{stage="similarity",le="+Inf"} 2' in text
+    assert 'cinerag_queries_total 2' in text
+    assert f'cinerag_catalog_movies {len(cinerag.movies)}' in text
+    status, served = asyncio.run(CineRAGServer(cinerag).dispatch('GET', '/metrics', b''))
+    assert status == 200 and served.startswith(text.split('\n# TYPE cinerag_catalog_movies')[0])
+
+def test_buckets_are_cumulative():
+    metrics = Metrics(enabled=True)
+    for seconds in (LATENCY_BUCKETS[0] / 2, LATENCY_BUCKETS[0] / 2, LATENCY_BUCKETS[-1] * 2):
+        metrics.observe('stage', seconds)
+    buckets = metrics.stats()['stages']['stage']['buckets']
+    assert buckets[str(LATENCY_BUCKETS[0])] == 2
+    assert buckets[str(LATENCY_BUCKETS[-1])] == 2
+    assert buckets['+Inf'] == 3
+
+def test_disabled_metrics_record_nothing(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.intelligent_movie_search('space adventure', 3)
+    assert cinerag.metrics.stats()['stages'] == {} and cinerag.metrics.stats()['counters'] == {}
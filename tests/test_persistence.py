@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import main
+from main import EncoderMismatchError, HashingEncoder, Movie
+
+def test_lexical_index_persists_with_catalog(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.save_system_data()
+    expected = {query: cinerag.lexical_index.search(query, 5) for query in ('space', 'family magic', 'spy')}
+    cinerag.interaction_log.close()
+
+    restarted = make_cinerag()
+    assert restarted.lexical_index.postings == {}  # Served from the saved runs, not re-tokenized
+    for query, (rows, scores) in expected.items():
+        loaded_rows, loaded_scores = restarted.lexical_index.search(query, 5)
+        assert loaded_rows.tolist() == rows.tolist()
+        np.testing.assert_allclose(loaded_scores, scores, rtol=1e-6)
+
+    # Updates copy loaded postings out before changing them
+    movie_id = restarted.title_index.lookup('Dune')
+    restarted.add_movie_to_system(Movie('Dune', '2021', 'Sci-Fi', 8.0, 'A spy on a desert planet'))
+    assert movie_id in restarted.lexical_index.search('spy', 15)[0].tolist()
+    assert movie_id not in restarted.lexical_index.search('paul', 15)[0].tolist()
+
+def test_lexical_index_from_another_save_is_rebuilt(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.save_system_data()
+    cinerag.interaction_log.close()
+    with open(main.CATALOG_FILE) as f:
+        catalog = json.load(f)
+    lexical_file = main.snapshot_files(os.path.join(main.DATA_DIR, catalog['columns']))[3]
+    assert main.LexicalIndex.load(lexical_file, 'another save') is None
+
+    catalog['snapshot'] = 'another save'
+    with open(main.CATALOG_FILE, 'w') as f:
+        json.dump(catalog, f)
+    restarted = make_cinerag()
+    assert restarted.lexical_index.postings
+    assert len(restarted.lexical_index) == len(restarted.movies)
+
+def test_catalog_columns_round_trip(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.add_movie_to_system(Movie('Amélie', '', 'Comedy/Romance', 8.3, 'Café life in Montmartre', 'poster.jpg'))
+    cinerag.save_system_data()
+    expected = list(cinerag.movies)
+    cinerag.interaction_log.close()
+
+    restarted = make_cinerag()
+    assert list(restarted.movies) == expected
+    assert restarted.title_index.lookup('amelie') is None  # Accents are kept in the stored title
+    assert restarted.title_index.lookup('AMÉLIE') == len(expected) - 1
+
+    # Mapped columns are copied out on the first change
+    movie_id = restarted.title_index.lookup('Dune')
+    restarted.add_movie_to_system(Movie('Dune', '2021', 'Sci-Fi', 9.1, expected[movie_id].description))
+    restarted.add_movie_to_system(Movie('Arrival', '2016', 'Sci-Fi/Drama', 7.9, 'Linguists meet visitors'))
+    restarted.save_system_data()
+    expected = list(restarted.movies)
+    restarted.interaction_log.close()
+
+    again = make_cinerag()
+    assert list(again.movies) == expected
+    assert again.movies[movie_id].rating == 9.1
+    assert len([name for name in os.listdir(main.DATA_DIR) if name.startswith('snapshot-')]) == 1
+
+def test_catalog_saved_as_json_rows_is_migrated(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.save_system_data()
+    expected = list(cinerag.movies)
+    cinerag.interaction_log.close()
+
+    with open(main.CATALOG_FILE) as f:
+        catalog = json.load(f)
+    # Older saves kept the embeddings next to catalog.json
+    os.replace(main.snapshot_files(os.path.join(main.DATA_DIR, catalog['columns']))[0], main.EMBEDDINGS_FILE)
+    del catalog['columns'], catalog['snapshot']
+    catalog['movies'] = [movie.astuple() for movie in expected]
+    with open(main.CATALOG_FILE, 'w') as f:
+        json.dump(catalog, f)
+
+    restarted = make_cinerag()
+    assert list(restarted.movies) == expected
+    assert restarted.catalog_dirty
+    restarted.save_system_data()
+    with open(main.CATALOG_FILE) as f:
+        assert 'movies' not in json.load(f)
+    assert not os.path.exists(main.EMBEDDINGS_FILE)
+
+def test_interrupted_save_keeps_previous_snapshot(make_cinerag, monkeypatch):
+    cinerag = make_cinerag()
+    cinerag.enable_ann_index(num_lists=4, nprobe=4)
+    cinerag.enable_quantization('int8')
+    cinerag.save_system_data()
+    expected = [movie.title for movie, _ in cinerag.intelligent_movie_search('space', 15)]
+
+    # Crash after the new snapshot's files are written but before catalog.json switches to it
+    write_file_atomically = main.write_file_atomically
+    def crash_on_catalog(path, *args, **kwargs):
+        if path == main.CATALOG_FILE:
+            raise OSError('simulated crash')
+        write_file_atomically(path, *args, **kwargs)
+    monkeypatch.setattr(main, 'write_file_atomically', crash_on_catalog)
+    cinerag.add_movie_to_system(Movie('Arrival', '2016', 'Sci-Fi/Drama', 7.9, 'Linguists meet visitors from space'))
+    cinerag.save_system_data()
+    cinerag.interaction_log.close()
+    monkeypatch.setattr(main, 'write_file_atomically', write_file_atomically)
+
+    restarted = make_cinerag()
+    assert len(restarted.movies) == len(restarted.movie_embeddings) == len(expected)
+    assert len(restarted.ann_index) == len(restarted.quantized) == len(expected)
+    assert [movie.title for movie, _ in restarted.intelligent_movie_search('space', 15)] == expected
+
+def test_embeddings_from_another_save_are_rebuilt(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.save_system_data()
+    with open(main.CATALOG_FILE) as f:
+        snapshot_dir = os.path.join(main.DATA_DIR, json.load(f)['columns'])
+    cinerag.add_movie_to_system(Movie('Arrival', '2016', 'Sci-Fi/Drama', 7.9, 'Linguists meet visitors'))
+    cinerag.interaction_log.close()
+
+    # Older saves replaced embeddings.npy in DATA_DIR before the catalog, so a crash could mismatch them
+    os.remove(main.snapshot_files(snapshot_dir)[0])
+    np.save(main.EMBEDDINGS_FILE, cinerag.movie_embeddings.vectors)
+    restarted = make_cinerag()
+    assert len(restarted.movie_embeddings) == len(restarted.movies) == len(cinerag.movies) - 1
+    assert restarted.intelligent_movie_search("the batman", 1)[0][0].title == 'The Batman'
+
+def test_encoder_mismatch_needs_explicit_reencode(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.save_system_data()
+
+    with pytest.raises(EncoderMismatchError, match='reencode'):
+        make_cinerag(ai_model=HashingEncoder(dimension=256))
+
+    reencoded = make_cinerag(ai_model=HashingEncoder(dimension=256), reencode=True)
+    assert len(reencoded.movies) == len(cinerag.movies)
+    assert reencoded.movie_embeddings.vectors.shape == (len(cinerag.movies), 256)
+    assert reencoded.intelligent_movie_search('the batman', 1)[0][0].title == 'The Batman'
+
+def test_unseeded_catalog_starts_empty(make_cinerag):
+    cinerag = make_cinerag(seed_catalog=False)
+    assert len(cinerag.movies) == 0
+    cinerag.add_movie_batch([Movie('Only Movie', '2020', 'Drama', 7.0, 'The one and only')])
+    cinerag.save_system_data()
+    assert [movie.title for movie in make_cinerag(seed_catalog=False).movies] == ['Only Movie']
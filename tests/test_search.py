@@ -0,0 +1,86 @@
+import numpy as np
+
+import main
+from main import SearchFilters
+
+def test_hybrid_search_keeps_dislike_penalty(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('The Batman', 'like', 'u1')
+    cinerag.learn_user_preference('Dune', 'dislike', 'u1')
+
+    for results in (cinerag.intelligent_movie_search('space', 3, 'u1'),
+                    cinerag.search_many(['space'], 3, 'u1')[0]):
+        titles = [movie.title for movie, _ in results]
+        scores = [score for _, score in results]
+        assert 'Dune' not in titles
+        assert titles[0] == 'The Batman'
+        assert scores == sorted(scores, reverse=True)
+
+    semantic = cinerag.intelligent_movie_search('space', 3, 'u1', hybrid=False)
+    assert 'Dune' not in [movie.title for movie, _ in semantic]
+
+def test_hybrid_scores_agree_with_order(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('Encanto', 'like', 'u1')
+    for query in ('space', 'Batman', 'family adventure', 'spy thriller'):
+        scores = [score for _, score in cinerag.intelligent_movie_search(query, 5, 'u1')]
+        assert scores == sorted(scores, reverse=True)
+
+def test_stale_cached_results_count_as_misses(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.intelligent_movie_search('space adventure', 3, 'u1')
+    cinerag.intelligent_movie_search('space adventure', 3, 'u1')
+    assert (cinerag.result_cache.hits, cinerag.result_cache.misses, len(cinerag.result_cache)) == (1, 1, 1)
+
+    cinerag.learn_user_preference('Dune', 'dislike', 'u1')
+    assert 'Dune' not in [movie.title for movie, _ in cinerag.intelligent_movie_search('space adventure', 3, 'u1')]
+    assert (cinerag.result_cache.hits, cinerag.result_cache.misses, len(cinerag.result_cache)) == (1, 2, 1)
+
+def test_stale_recommendations_count_as_misses(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('Dune', 'like', 'u1')
+    first = cinerag.get_ai_recommendations(3, 'u1')
+    assert cinerag.get_ai_recommendations(3, 'u1') == first
+    assert (cinerag.recommendation_cache.hits, cinerag.recommendation_cache.misses) == (1, 1)
+
+    cinerag.learn_user_preference(first[0][0].title, 'like', 'u1')
+    assert first[0][0].title not in [movie.title for movie, _ in cinerag.get_ai_recommendations(3, 'u1')]
+    assert (cinerag.recommendation_cache.hits, cinerag.recommendation_cache.misses) == (1, 2)
+    assert len(cinerag.recommendation_cache) == 1
+
+def test_filters_keep_boundary_values(make_cinerag):
+    cinerag = make_cinerag()
+    movies = list(cinerag.movies)
+    for rating in sorted({movie.rating for movie in movies}):
+        mask = cinerag.metadata.filter_mask(SearchFilters(min_rating=rating))
+        assert {movies[row].title for row in np.flatnonzero(mask)} == \
+            {movie.title for movie in movies if movie.rating >= rating}
+
+    filters = SearchFilters(genres=['sci-fi', 'Horror'], year_min=2021, year_max=2021, min_rating=6.3)
+    titles = {movie.title for movie, _ in cinerag.intelligent_movie_search('movie', 15, filters=filters)}
+    assert titles == {'Dune', 'Eternals', 'A Quiet Place Part II'}
+    assert cinerag.metadata.filter_mask(SearchFilters(year_min=2022)).sum() == 3
+
+def test_sharded_search_matches_single_thread(make_cinerag, monkeypatch):
+    monkeypatch.setattr(main, 'SHARD_MIN_ROWS', 4)
+    single, sharded = make_cinerag(), make_cinerag(search_workers=3)
+    for cinerag in (single, sharded):
+        cinerag.learn_user_preference('Encanto', 'like', 'u1')
+        cinerag.learn_user_preference('Dune', 'dislike', 'u1')
+        assert cinerag.profiles.get('u1').preferred_genres
+
+    for query, filters in (('space adventure', None), ('family', SearchFilters(year_min=2021, min_rating=6.0))):
+        expected = single.intelligent_movie_search(query, 6, 'u1', filters, hybrid=False)
+        results = sharded.intelligent_movie_search(query, 6, 'u1', filters, hybrid=False)
+        assert [movie.title for movie, _ in results] == [movie.title for movie, _ in expected]
+        np.testing.assert_allclose([score for _, score in results], [score for _, score in expected], rtol=1e-6)
+    assert 'Dune' not in [movie.title for movie, _ in sharded.intelligent_movie_search('desert planet', 3, 'u1')]
+
+def test_sharded_scoring_has_its_own_stage(make_cinerag, monkeypatch):
+    monkeypatch.setattr(main, 'SHARD_MIN_ROWS', 4)
+    cinerag = make_cinerag(search_workers=2, metrics=True)
+    cinerag.learn_user_preference('Encanto', 'like', 'u1')
+    cinerag.intelligent_movie_search('space adventure', 3, 'u1', hybrid=False)
+    stages = cinerag.metrics.stats()['stages']
+    assert stages['sharded_scoring']['count'] == 1
+    assert 'similarity' not in stages and 'personalization' not in stages
@@ -0,0 +1,55 @@
+import asyncio
+
+from server import CineRAGServer
+
+def request(server, *targets):
+    """Responses to GET requests sent one after another, while the micro-batcher runs"""
+    async def run():
+        server.batcher.start()
+        try:
+            return [await server.dispatch('GET', target, b'') for target in targets]
+        finally:
+            await server.batcher.stop()
+    return asyncio.run(run())
+
+def test_search_matches_in_process_search(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.learn_user_preference('Encanto', 'like', 'u1')
+    server = CineRAGServer(cinerag)
+
+    (status, payload), title, repeat = request(server, '/search?q=space+adventure&n=4&user=u1',
+                                               '/search?q=the+batman&n=2',
+                                               '/search?q=Space%20Adventure&n=4&user=u1')
+    assert status == 200
+    # Title queries and repeats never reach the encoder
+    assert server.batcher.items == 1
+    assert title[1]['results'][0]['title'] == 'The Batman'
+    assert repeat[1]['results'] == payload['results']
+
+    expected = cinerag.intelligent_movie_search('space adventure', 4, 'u1')
+    assert [(result['title'], result['score']) for result in payload['results']] == \
+        [(movie.title, score) for movie, score in expected]
+    assert cinerag.result_cache.hits == 2
+
+def test_result_count_is_validated(make_cinerag):
+    server = CineRAGServer(make_cinerag())
+    targets = [f'{endpoint}&n={n}' for endpoint in ('/search?q=space', '/recommendations?user=u1')
+               for n in ('-2', '0', '101', 'ten')]
+    *rejected, (status, payload) = request(server, *targets, '/search?q=space&n=100')
+    for error_status, error in rejected:
+        assert error_status == 400
+        assert "'n' must be" in error['error']
+    assert status == 200
+    assert len(payload['results']) == 15
+
+def test_malformed_feedback_is_rejected(make_cinerag):
+    server = CineRAGServer(make_cinerag())
+    for body in (b'[1, 2]', b'"like"', b'{"title": 5, "action": "like"}', b'{"title": "Dune", "action": "love"}',
+                 b'{"title": "Dune", "action": "like", "user": {"a": 1}}', b'not json'):
+        status, payload = asyncio.run(server.dispatch('POST', '/feedback', body))
+        assert status == 400, body
+        assert 'feedback' in payload['error']
+
+    status, payload = asyncio.run(server.dispatch('POST', '/feedback', b'{"title": "dune", "action": "like", "user": 7}'))
+    assert (status, payload['user']) == (200, '7')
+    assert server.cinerag.profiles.get('7').liked == {server.cinerag.title_index.lookup('Dune')}
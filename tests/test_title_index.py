@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+
+import main
+from main import Movie
+
+def test_title_lookups_ignore_case_punctuation_and_articles(make_cinerag):
+    cinerag = make_cinerag()
+    batman = cinerag.title_index.movie_id('The Batman')
+    assert cinerag.title_index.lookup('the   BATMAN!') == batman
+    assert cinerag.title_index.lookup('Batman') == batman
+    assert cinerag.title_index.movie_id('Batman') is None  # Exact keys keep their article
+    assert cinerag.title_index.lookup('Spider Man No Way Home') == cinerag.title_index.movie_id('Spider-Man: No Way Home')
+    assert 'Batmann' not in cinerag.title_index
+
+    assert cinerag.suggest_titles('Encantoo')[0] == 'Encanto'
+    assert cinerag.suggest_titles('Cruela')[0] == 'Cruella'
+    assert cinerag.title_index.fuzzy('zzzz qqqq') == []
+
+def test_upsert_reindexes_in_place(make_cinerag):
+    cinerag = make_cinerag()
+    cinerag.enable_ann_index(num_lists=4, nprobe=4)
+    movie_id = cinerag.title_index.lookup('Dune')
+    size = len(cinerag.movies)
+
+    cinerag.add_movie_to_system(Movie('DUNE', '2021', 'Sci-Fi/Adventure', 8.0, 'Sandworms guard the spice'))
+    assert len(cinerag.movies) == size
+    assert cinerag.title_index.lookup('dune') == movie_id
+    assert cinerag.movies[movie_id].description == 'Sandworms guard the spice'
+
+    rows, _ = cinerag.lexical_index.search('sandworms', 5)
+    assert rows.tolist() == [movie_id]
+    vector = cinerag.movie_embeddings[movie_id]
+    np.testing.assert_allclose(vector, cinerag.encode_query('DUNE Sci-Fi/Adventure Sandworms guard the spice'),
+                               atol=1e-6)
+    assert sum(row == movie_id for rows in cinerag.ann_index.lists for row in rows) == 1
+    assert movie_id in cinerag.ann_index.candidates(vector, nprobe=1)
+
+    cinerag.save_system_data()
+    cinerag.interaction_log.close()
+    restarted = make_cinerag()
+    assert restarted.lexical_index.search('sandworms', 5)[0].tolist() == [movie_id]
+
+def test_title_index_persists(make_cinerag, monkeypatch):
+    cinerag = make_cinerag()
+    cinerag.add_movie_to_system(Movie('The Lighthouse', '2019', 'Horror', 7.4, 'Two keepers on a remote island'))
+    cinerag.save_system_data()
+    cinerag.interaction_log.close()
+
+    with monkeypatch.context() as patched:
+        patched.setattr(main, 'normalize_title', None)  # Loading must not normalize the catalog's titles
+        restarted = make_cinerag()
+    assert (restarted.title_index.ids, restarted.title_index.aliases) == \
+        (cinerag.title_index.ids, cinerag.title_index.aliases)
+    assert restarted.title_index.lookup('lighthouse') == len(restarted.movies) - 1
+    assert restarted.title_index.fuzzy('Lighthuose')[0][0] == len(restarted.movies) - 1
+
+    # Keys from another snapshot are rebuilt from the titles
+    with open(main.CATALOG_FILE) as f:
+        catalog = json.load(f)
+    assert main.TitleIndex.load(main.snapshot_files(os.path.join(main.DATA_DIR, catalog['columns']))[4],
+                                restarted.movies.titles, 'another save') is None